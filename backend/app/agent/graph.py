@@ -1,47 +1,65 @@
 # ...existing code...
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated, Sequence, Any
+from typing import TypedDict, Annotated, Sequence, Any, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage, message_chunk_to_message
 from langchain_core.tools import Tool
-import traceback
+from langchain_core.runnables import RunnableConfig
+import logging
 import operator
-from .tools import get_all_tools
+from .tools import get_all_tools, use_tool_context, create_tasks_batch, delete_tasks_batch, READ_ONLY_TOOLS
+from .replies import render_tool_reply
 import os
 import json
+import asyncio
+import threading
+import time
 from app.agent.prompt import get_system_prompt
+from app.agent.llm_limits import (
+    LLM_COALESCE, LLM_QUEUE_DEADLINE, RateLimitExceeded,
+    coalesce_key, estimate_call_tokens, estimate_usage, get_rate_limiter, get_request_coalescer,
+)
 from app.utils.api_key_manager import get_api_key_manager
+from app.utils.logging_setup import get_logger
+from app.metrics import observe_llm_call, token_usage
 
+logger = get_logger(__name__)
 
+MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
 
-try:
-    from langgraph.prebuilt import ToolExecutor as _ExecutorClass
-    _EXEC_KIND = "ToolExecutor"
-except Exception:
-    _ExecutorClass = None
-    try:
-        from langgraph.prebuilt import chat_agent_executor as _executor_factory
-        _EXEC_KIND = "chat_agent_executor"
-    except Exception:
-        try:
-            from langgraph.prebuilt import create_react_agent as _executor_factory
-            _EXEC_KIND = "create_react_agent"
-        except Exception:
-            _executor_factory = None
-            _EXEC_KIND = None
+# Tool calls from one model turn that may run at once
+TOOL_CONCURRENCY = int(os.getenv("AGENT_TOOL_CONCURRENCY", "4"))
+
+# Same-type calls that can be merged into one database round trip
+_BATCH_HANDLERS = {"create_task": create_tasks_batch, "delete_task": delete_tasks_batch}
+
+# Tools whose successful result is answered from a template, ending the run
+# without a second model call. Set AGENT_TERMINAL_TOOLS="" to always loop back.
+# bulk_update_tasks / bulk_delete_tasks stay out by default so the model still
+# sees their result and can ask the user before changing many tasks.
+TERMINAL_TOOLS = frozenset(
+    name.strip() for name in os.getenv(
+        "AGENT_TERMINAL_TOOLS",
+        "create_task,delete_task,update_task,bulk_create_tasks",
+    ).split(",")
+    if name.strip()
+)
+
+# Compiled graphs keyed by (model, tool names); see get_agent_graph()
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
 
 class AgentState(TypedDict):
     messages: Annotated[Sequence[HumanMessage | AIMessage | SystemMessage], operator.add]
+    # Rolling summary of turns that were trimmed from the session history
+    summary: str
     
-def _manual_invoke_tool(tools, tool_call):
+async def _invoke_tool(tools, tool_call):
     """
-    Best-effort fallback that tries to run a tool call against the `tools`
-    returned by get_all_tools(). This supports tools as dict or list and
-    parses JSON arguments when provided as a string.
+    Run a tool call against the `tools` returned by get_all_tools(). This
+    supports tools as dict or list and parses JSON arguments when provided
+    as a string.
     """
-    # Debug: print what we received
-    print(f"_manual_invoke_tool called with tool_call type: {type(tool_call)}, content: {tool_call}", flush=True)
-    
     # Handle different tool_call formats
     # In newer versions, tool_call might be a dict with 'name' and 'args' keys
     if isinstance(tool_call, dict):
@@ -54,7 +72,8 @@ def _manual_invoke_tool(tools, tool_call):
         raw_args = getattr(tool_call, "arguments", None) or getattr(tool_call, "input", None) \
                    or getattr(tool_call, "kwargs", None)
     
-    print(f"  - Extracted name: {name}, raw_args: {raw_args}", flush=True)
+    # Arguments carry task contents, so they are only logged at DEBUG
+    logger.debug("Invoking tool %s with args %s", name, raw_args)
 
     # resolve tool from tools (supports dict or iterable)
     tool_obj = None
@@ -65,7 +84,6 @@ def _manual_invoke_tool(tools, tool_call):
             tname = getattr(t, "name", None) or getattr(t, "__name__", None) or (getattr(t, "tool", None) and getattr(t.tool, "name", None))
             if tname == name:
                 tool_obj = t
-                print(f"  - Found matching tool: {tname}", flush=True)
                 break
 
     if tool_obj is None:
@@ -89,8 +107,11 @@ def _manual_invoke_tool(tools, tool_call):
         parsed_kwargs = {"input": raw_args}
 
     try:
-        # For LangChain tools, use invoke() which expects input as keyword args
-        if hasattr(tool_obj, "invoke"):
+        # For LangChain tools, use ainvoke() which expects input as keyword args;
+        # the task tools are coroutines backed by the async repository
+        if hasattr(tool_obj, "ainvoke"):
+            return await tool_obj.ainvoke(parsed_kwargs)
+        elif hasattr(tool_obj, "invoke"):
             return tool_obj.invoke(parsed_kwargs)
         elif hasattr(tool_obj, "run"):
             # Some tools might use run() instead
@@ -100,133 +121,268 @@ def _manual_invoke_tool(tools, tool_call):
         else:
             return {"error": f"Tool '{name}' is not callable"}
     except Exception as e:
-        print(f"  Tool execution error: {e}", flush=True)
+        logger.warning("Tool %s raised: %s", name, e)
         return {"error": f"Tool '{name}' raised: {e}"}
 
-def create_agent_graph():
-    tools = get_all_tools()
-    print(f"Loaded {len(tools)} tools: {[getattr(t, 'name', str(t)) for t in tools]}", flush=True)
+def _call_name_args(tool_call):
+    if isinstance(tool_call, dict):
+        return tool_call.get("name"), tool_call.get("args")
+    return getattr(tool_call, "name", None), getattr(tool_call, "args", None)
 
-  
-    tool_executor = None
-    if _EXEC_KIND == "ToolExecutor" and _ExecutorClass is not None:
-        try:
-            tool_executor = _ExecutorClass(tools)
-            print(f"Created ToolExecutor", flush=True)
-        except Exception as e:
-            print(f"Failed to create ToolExecutor: {e}", flush=True)
-            tool_executor = None
-    elif _EXEC_KIND in ("chat_agent_executor", "create_react_agent") and _executor_factory is not None:
-        # try best-effort creation; factory signatures vary, so try a couple forms
-        try:
-            tool_executor = _executor_factory(tools=tools)
-            print(f"Created {_EXEC_KIND} with tools kwarg", flush=True)
-        except TypeError:
-            try:
-                tool_executor = _executor_factory(tools)
-                print(f"Created {_EXEC_KIND} with positional arg", flush=True)
-            except Exception as e:
-                print(f"Failed to create {_EXEC_KIND}: {e}", flush=True)
-                tool_executor = None
-    
-    print(f"Executor kind: {_EXEC_KIND}, tool_executor: {tool_executor}", flush=True)
+def _call_id(tool_call):
+    if isinstance(tool_call, dict):
+        return tool_call.get("id") or "unknown"
+    return getattr(tool_call, "id", None) or "unknown"
+
+def _call_target(tool_call):
+    """The task a mutating call refers to, or None for calls that touch no existing task"""
+    name, args = _call_name_args(tool_call)
+    if name not in ("update_task", "delete_task") or not isinstance(args, dict):
+        return None
+    if args.get("task_id"):
+        return ("id", str(args["task_id"]).strip())
+    return ("title", str(args.get("title_match") or "").lower())
+
+def _plan_tool_jobs(tool_calls, tool_names):
+    """
+    Split one turn's calls into independent jobs of (batch tool name or None,
+    call indexes). Calls aimed at the same task stay one sequential job so
+    "mark task 4 done and delete it" keeps its order; same-type creates and
+    deletes by id are merged when there are at least two of them.
+    """
+    targets = [_call_target(tc) for tc in tool_calls]
+    chains, groups, jobs = {}, {}, []
+    for i, tool_call in enumerate(tool_calls):
+        target = targets[i]
+        if target is not None and targets.count(target) > 1:
+            chains.setdefault(target, []).append(i)
+            continue
+        name, args = _call_name_args(tool_call)
+        if (name in _BATCH_HANDLERS and name in tool_names and isinstance(args, dict)
+                and (name != "delete_task" or (args.get("task_id") and not args.get("title_match")))):
+            groups.setdefault(name, []).append(i)
+            continue
+        jobs.append((None, [i]))
+
+    for name, idxs in groups.items():
+        if len(idxs) > 1:
+            jobs.append((name, idxs))
+        else:
+            jobs.extend((None, [i]) for i in idxs)
+    jobs.extend((None, idxs) for idxs in chains.values())
+    return jobs
+
+def _terminal_reply(tool_calls, results, terminal_tools) -> Optional[str]:
+    """
+    Templated final reply when every call in the turn is a terminal tool that
+    succeeded; None means the model should see the results and respond.
+    """
+    if not terminal_tools or not tool_calls:
+        return None
+    replies = []
+    for tool_call, result in zip(tool_calls, results):
+        name, args = _call_name_args(tool_call)
+        if name not in terminal_tools:
+            return None
+        reply = render_tool_reply(name, args if isinstance(args, dict) else {}, result)
+        if reply is None:
+            return None
+        replies.append(reply)
+    return "\n".join(replies)
+
+async def _stream_model(model, messages) -> AIMessage:
+    """
+    Call the model through astream so each token reaches astream_events as
+    on_chat_model_stream; langchain-core 0.1.30's ainvoke returns the whole
+    reply at once. The chunks are summed into one message for the state.
+    """
+    response = None
+    async for chunk in model.astream(messages):
+        response = chunk if response is None else response + chunk
+    if response is None:
+        return AIMessage(content="")
+    return message_chunk_to_message(response)
+
+def create_agent_graph(api_key=None, tools=None, model=MODEL_NAME, terminal_tools=TERMINAL_TOOLS):
+    if tools is None:
+        tools = get_all_tools()
+    logger.info("Building agent graph with %d tools", len(tools))
 
 
     api_key_manager = get_api_key_manager()
-    api_key = api_key_manager.get_active_key()
-    
-    if not api_key:
+    # An explicit key (scripts, tests) pins the graph to it; otherwise every
+    # model call takes a key from the manager's pool
+    pinned_key = api_key
+    if not (pinned_key or api_key_manager.keys):
         raise RuntimeError("No Google API key configured. Please set GOOGLE_API_KEY or GOOGLE_API_KEYS environment variable.")
-    
 
-    llm = ChatGoogleGenerativeAI(
-        model = "gemini-2.5-flash-lite",
-        google_api_key=api_key,
-        temperature=0
-    )
-    
-    try:
-       
-        llm_with_tools = llm.bind_tools(tools)
-        print(f"Successfully bound {len(tools)} tools using bind_tools()", flush=True)
-    except Exception as e1:
-        print(f"bind_tools() failed: {e1}", flush=True)
-        try:
-            # Fallback: use bind with tool descriptions
-            llm_with_tools = llm.bind(tools=tools)
-            print(f"Successfully bound {len(tools)} tools using bind(tools=...)", flush=True)
-        except Exception as e2:
-            print(f"bind(tools=...) also failed: {e2}", flush=True)
-            print(f"Traceback: {traceback.format_exc()}", flush=True)
-            llm_with_tools = llm
-            print("WARNING: Falling back to plain LLM without tools", flush=True)
-
-    def call_model(state: AgentState):
-        messages = state["messages"]
-        
-        system_prompt = SystemMessage(content=get_system_prompt())
-        
-        full_messages = [system_prompt] + messages
-        print(f"\n{'='*60}", flush=True)
-        print(f"Calling model with {len(full_messages)} messages", flush=True)
-        print(f"Last user message: {messages[-1].content if messages else 'None'}", flush=True)
+    def bind_model(key):
+        llm = ChatGoogleGenerativeAI(
+            model = model,
+            google_api_key=key,
+            temperature=0
+        )
         
         try:
-            response = llm_with_tools.invoke(full_messages)
-            print(f"Model response received:", flush=True)
-            print(f"  - Type: {type(response).__name__}", flush=True)
-            print(f"  - Content: {response.content if hasattr(response, 'content') else 'N/A'}", flush=True)
-            print(f"  - Has tool_calls: {hasattr(response, 'tool_calls')}", flush=True)
-            if hasattr(response, 'tool_calls') and response.tool_calls:
-                print(f"  - Tool calls count: {len(response.tool_calls)}", flush=True)
-                for tc in response.tool_calls:
-                    print(f"    - Call: {getattr(tc, 'name', '?')} with args: {getattr(tc, 'args', '?')}", flush=True)
-            else:
-                print(f"  - No tool calls in response", flush=True)
-            print(f"{'='*60}\n", flush=True)
-            return {"messages": [response]}
-        except Exception as exc:
-            print(f"Model invoke exception: {repr(exc)}", flush=True)
-            traceback.print_exc()
+           
+            llm_with_tools = llm.bind_tools(tools)
+            logger.debug("Bound %d tools using bind_tools()", len(tools))
+        except Exception as e1:
+            logger.warning("bind_tools() failed: %s", e1)
             try:
-                response = llm_with_tools(full_messages) if callable(llm_with_tools) else AIMessage(content=f"Error invoking model: {exc}")
-            except Exception as exc2:
-                print(f"Model fallback exception: {repr(exc2)}", flush=True)
-                traceback.print_exc()
-                response = AIMessage(content=f"Error invoking model: {exc2}")
-        
+                # Fallback: use bind with tool descriptions
+                llm_with_tools = llm.bind(tools=tools)
+                logger.info("Bound %d tools using bind(tools=...)", len(tools))
+            except Exception as e2:
+                logger.exception("bind(tools=...) also failed, falling back to plain LLM without tools")
+                llm_with_tools = llm
+        return llm_with_tools
+
+    # Tool-bound model per API key, built the first time the pool hands out that key
+    bound_models = {}
+    bound_models_lock = threading.Lock()
+
+    def model_for_key(key):
+        bound = bound_models.get(key)
+        if bound is None:
+            with bound_models_lock:
+                bound = bound_models.get(key)
+                if bound is None:
+                    bound = bound_models[key] = bind_model(key)
+        return bound
+
+    model_for_key(pinned_key or api_key_manager.get_active_key())
+
+    def prepare_call(key, state: AgentState):
+        messages = state["messages"]
+        # Memoized per day; the static part comes first so Gemini can reuse it as a cached prefix
+        prompt_text = get_system_prompt()
+        if state.get("summary"):
+            prompt_text += f"\n\n## Earlier in this conversation:\n{state['summary']}"
+        return model_for_key(key), [SystemMessage(content=prompt_text)] + messages
+
+    limiter = get_rate_limiter()
+    coalescer = get_request_coalescer()
+
+    async def invoke_model(state: AgentState):
+        tried = []
+        last_error = None
+        deadline = time.monotonic() + LLM_QUEUE_DEADLINE
+        while True:
+            key = pinned_key or api_key_manager.acquire_key(exclude=tried)
+            if key is None:
+                # Every key failed this turn, is cooling down or has no rate-limit capacity
+                raise last_error or RuntimeError("API quota exceeded: all API keys are cooling down")
+
+            model_to_call, full_messages = prepare_call(key, state)
+            estimated = estimate_call_tokens(full_messages)
+            # Only queue on the last usable key; while others remain they must have capacity right now.
+            # Cooling-down and over-budget keys are never acquirable, so they don't count.
+            last_candidate = pinned_key or not api_key_manager.available_count(exclude=tried + [key])
+            try:
+                await limiter.acquire(key, model, estimated, deadline if last_candidate else time.monotonic())
+            except RateLimitExceeded as exc:
+                if pinned_key:
+                    raise
+                # Out of local budget, not a provider error: the key stays in rotation
+                api_key_manager.return_unused(key)
+                tried.append(key)
+                last_error = exc
+                continue
+            logger.debug("Calling model with %d messages", len(full_messages))
+
+            started = time.perf_counter()
+            try:
+                response = await _stream_model(model_to_call, full_messages)
+            except Exception as exc:
+                observe_llm_call("agent", model, time.perf_counter() - started, outcome="error")
+                if not pinned_key and api_key_manager.release(key, exc):
+                    # Quota/rate/auth failure: the key is parked, retry on the next one
+                    logger.warning("Model call hit a key limit, retrying on another key")
+                    limiter.penalize(key, model)
+                    tried.append(key)
+                    last_error = exc
+                    continue
+                logger.exception("Model invoke failed")
+                return AIMessage(content=f"Error invoking model: {exc}")
+
+            if not pinned_key:
+                api_key_manager.release(key)
+            usage, source = token_usage(response), "reported"
+            if usage is None:
+                # The pinned genai client reports no token counts; settle the TPM bucket on an estimate
+                usage, source = estimate_usage(full_messages, response), "estimated"
+            observe_llm_call("agent", model, time.perf_counter() - started, usage, source)
+            limiter.record_usage(key, model, estimated, usage["input"] + usage["output"])
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Model response: %d chars, tool calls: %s",
+                    len(response.content or "") if hasattr(response, "content") else 0,
+                    [_call_name_args(tc)[0] for tc in (getattr(response, "tool_calls", None) or [])],
+                )
+            return response
+
+    async def call_model(state: AgentState, config: RunnableConfig):
+        if not LLM_COALESCE:
+            return {"messages": [await invoke_model(state)]}
+        # Identical concurrent calls (same conversation and task-state version) share one request
+        version = ((config or {}).get("configurable") or {}).get("state_version")
+        key = coalesce_key(model, state["messages"], state.get("summary", ""), version)
+        response = await coalescer.run(key, lambda: invoke_model(state))
         return {"messages": [response]}
     
-    def call_tools(state: AgentState):
+    async def call_tools(state: AgentState, config: RunnableConfig):
+        # Tools read their db handle / user / request id from the run's config,
+        # so concurrent sessions never share state through module globals
+        tool_context = (config or {}).get("configurable", {}).get("tool_context")
+        with use_tool_context(tool_context):
+            return await _execute_tool_calls(state)
+
+    async def _execute_tool_calls(state: AgentState):
         last_message = state["messages"][-1]
         tool_calls = getattr(last_message, "tool_calls", None) or []
         
-        print(f"\ncall_tools called:", flush=True)
-        print(f"  - last_message type: {type(last_message).__name__}", flush=True)
-        print(f"  - tool_calls count: {len(tool_calls)}", flush=True)
-        if tool_calls:
-            print(f"  - First tool_call type: {type(tool_calls[0])}", flush=True)
-            print(f"  - First tool_call: {tool_calls[0]}", flush=True)
+        logger.debug("call_tools: %d tool calls", len(tool_calls))
         
         if not tool_calls:
-            print("  - No tool calls found, returning empty", flush=True)
             return {"messages": []}
         
-        responses = []
-        for tool_call in tool_calls:
-            print(f"\n  Executing tool_call: {tool_call}", flush=True)
-            # prefer langgraph executor if present
-            if tool_executor is not None and hasattr(tool_executor, "invoke"):
-                try:
-                    tool_result = tool_executor.invoke(tool_call)
-                    print(f"  Tool executor result: {tool_result}", flush=True)
-                except Exception as e:
-                    print(f"  Tool executor error: {e}, falling back to manual", flush=True)
-                    tool_result = _manual_invoke_tool(tools, tool_call)
-            else:
-                tool_result = _manual_invoke_tool(tools, tool_call)
-            print(f"  Tool final result: {tool_result}", flush=True)
-            responses.append(ToolMessage(content=str(tool_result), tool_call_id=getattr(tool_call, 'id', 'unknown')))
+        semaphore = asyncio.Semaphore(max(1, TOOL_CONCURRENCY))
+
+        async def run_one(tool_call):
+            tool_result = await _invoke_tool(tools, tool_call)
+            logger.debug("Tool %s result: %s", _call_name_args(tool_call)[0], tool_result)
+            return tool_result
+
+        async def run_job(batch_name, idxs):
+            async with semaphore:
+                if batch_name:
+                    logger.debug("Batching %d %s calls", len(idxs), batch_name)
+                    return await _BATCH_HANDLERS[batch_name]([_call_name_args(tool_calls[i])[1] for i in idxs])
+                return [await run_one(tool_calls[i]) for i in idxs]
+
+        # Independent jobs run concurrently (gather copies the tool context
+        # into each task); results are slotted back in call order
+        jobs = _plan_tool_jobs(tool_calls, {getattr(t, "name", None) for t in tools})
+        # In a mixed turn the reads run after the writes so they see them
+        reads = [job for job in jobs if all(_call_name_args(tool_calls[i])[0] in READ_ONLY_TOOLS for i in job[1])]
+        writes = [job for job in jobs if job not in reads]
+        results = [None] * len(tool_calls)
+        for phase in (writes, reads):
+            outputs = await asyncio.gather(*(run_job(batch_name, idxs) for batch_name, idxs in phase))
+            for (_, idxs), output in zip(phase, outputs):
+                for i, tool_result in zip(idxs, output):
+                    results[i] = tool_result
+
+        responses = [
+            ToolMessage(content=str(tool_result), tool_call_id=_call_id(tool_call))
+            for tool_call, tool_result in zip(tool_calls, results)
+        ]
+
+        reply = _terminal_reply(tool_calls, [r.content for r in responses], terminal_tools)
+        if reply:
+            logger.debug("Terminal tools succeeded, skipping follow-up model call")
+            responses.append(AIMessage(content=reply))
         
         return {"messages": responses}
     
@@ -235,12 +391,16 @@ def create_agent_graph():
         
         # If last message has tool calls, execute them
         if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
-            print(f"should_continue: Found tool calls, routing to 'tools'", flush=True)
             return "tools"
         
         # Otherwise end (go to END)
-        print(f"should_continue: No tool calls, ending flow", flush=True)
         return "end"
+
+    def after_tools(state: AgentState):
+        # Terminal tools already appended the final reply
+        if isinstance(state["messages"][-1], AIMessage):
+            return "end"
+        return "agent"
     
     workflow = StateGraph(AgentState)
     
@@ -258,8 +418,38 @@ def create_agent_graph():
         }
     )
     
-    workflow.add_edge("tools", "agent")
+    workflow.add_conditional_edges(
+        "tools",
+        after_tools,
+        {
+            "agent": "agent",
+            "end": END
+        }
+    )
     
     app = workflow.compile()
     
     return app
+
+
+def get_agent_graph():
+    """
+    Return the compiled agent graph, building it on first use. Graphs hold
+    no per-session state (tools read a per-run ToolContext) and pick an API
+    key per model call, so one compiled graph serves every connection on the
+    worker.
+    """
+    api_key_manager = get_api_key_manager()
+    if not api_key_manager.keys:
+        raise RuntimeError("No Google API key configured. Please set GOOGLE_API_KEY or GOOGLE_API_KEYS environment variable.")
+
+    tools = get_all_tools()
+    cache_key = (MODEL_NAME, tuple(getattr(t, "name", str(t)) for t in tools))
+    graph = _graph_cache.get(cache_key)
+    if graph is None:
+        with _graph_cache_lock:
+            graph = _graph_cache.get(cache_key)
+            if graph is None:
+                graph = create_agent_graph(tools=tools)
+                _graph_cache[cache_key] = graph
+    return graph
@@ -0,0 +1,170 @@
+"""
+Deterministic fast path for simple chat commands.
+
+Messages such as "delete task 3", "mark task 2 done" or "show my tasks" map
+one-to-one onto a tool call, so they are matched here with anchored regular
+expressions and executed directly, skipping the Gemini round trips. Anything
+that is not a high-confidence match returns None and goes to the agent graph.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from .tools import create_task, update_task, delete_task, fetch_task_listing, use_tool_context, ToolContext
+from .replies import render_tool_reply, render_task_listing
+from .graph import TERMINAL_TOOLS
+
+
+FAST_PATH_ENABLED = os.getenv("CHAT_FAST_PATH", "1").lower() not in ("0", "false", "no")
+
+
+
+def llm_calls_avoided(tool_name: str) -> int:
+    """
+    Model calls the graph would have made for this tool: one to pick the
+    tool, plus one to phrase the reply unless the tool is terminal (answered
+    from a template, see graph.TERMINAL_TOOLS).
+    """
+    return 1 if tool_name in TERMINAL_TOOLS else 2
+
+_STATUS_WORDS = {
+    "done": "done", "complete": "done", "completed": "done", "finished": "done",
+    "in progress": "in_progress", "in_progress": "in_progress", "started": "in_progress",
+    "todo": "todo", "to do": "todo", "to-do": "todo", "not done": "todo",
+}
+
+_POLITE = r"(?:please\s+|pls\s+|can you\s+|could you\s+)?"
+_END = r"\s*(?:please)?\s*[.!]*\s*$"
+_TASK = r"task\s*(?:#|no\.?|number)?\s*(\d+)"
+_STATUS = r"(done|complete|completed|finished|in[ _]progress|started|todo|to[ -]do|not done)"
+
+_PATTERNS = [
+    ("delete_task", re.compile(rf"^{_POLITE}(?:delete|remove)\s+{_TASK}{_END}", re.I)),
+    ("set_status", re.compile(rf"^{_POLITE}(?:mark|set)\s+{_TASK}\s+(?:as\s+|to\s+)?{_STATUS}{_END}", re.I)),
+    ("complete_task", re.compile(rf"^{_POLITE}(?:complete|finish)\s+{_TASK}{_END}", re.I)),
+    ("start_task", re.compile(rf"^{_POLITE}start(?:\s+working\s+on)?\s+{_TASK}{_END}", re.I)),
+    ("set_priority", re.compile(
+        rf"^{_POLITE}(?:set|make|change|mark)\s+{_TASK}(?:'s)?\s+(?:priority\s+)?(?:to\s+|as\s+)?(low|medium|high)(?:\s+priority)?{_END}",
+        re.I)),
+    ("list_tasks", re.compile(
+        rf"^{_POLITE}(?:show|list|display|get|view)(?:\s+me)?(?:\s+all)?(?:\s+of)?(?:\s+my)?\s+tasks{_END}", re.I)),
+    ("filter_priority", re.compile(
+        rf"^{_POLITE}(?:show|list|display|get|view)(?:\s+me)?(?:\s+all)?(?:\s+my)?\s+(low|medium|high)[ -]priority\s+tasks{_END}",
+        re.I)),
+    ("filter_status", re.compile(
+        rf"^{_POLITE}(?:show|list|display|get|view)(?:\s+me)?(?:\s+all)?(?:\s+my)?\s+{_STATUS}\s+tasks{_END}", re.I)),
+]
+
+
+@dataclass
+class Intent:
+    name: str
+    tool: str
+    args: dict = field(default_factory=dict)
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").strip().split())
+
+
+def match_intent(text: str) -> Optional[Intent]:
+    """Return the fast-path intent for `text`, or None when the agent should handle it"""
+    text = _normalize(text)
+    if not text or len(text) > 80:
+        return None
+
+    for name, pattern in _PATTERNS:
+        m = pattern.match(text)
+        if not m:
+            continue
+        if name == "delete_task":
+            return Intent(name, "delete_task", {"task_id": m.group(1)})
+        if name == "set_status":
+            return Intent(name, "update_task", {"task_id": m.group(1), "new_status": _STATUS_WORDS[m.group(2).lower().replace("_", " ")]})
+        if name == "complete_task":
+            return Intent(name, "update_task", {"task_id": m.group(1), "new_status": "done"})
+        if name == "start_task":
+            return Intent(name, "update_task", {"task_id": m.group(1), "new_status": "in_progress"})
+        if name == "set_priority":
+            return Intent(name, "update_task", {"task_id": m.group(1), "new_priority": m.group(2).lower()})
+        if name == "list_tasks":
+            return Intent(name, "list_tasks", {})
+        if name == "filter_priority":
+            return Intent(name, "filter_tasks", {"priority": m.group(1).lower()})
+        if name == "filter_status":
+            return Intent(name, "filter_tasks", {"status": _STATUS_WORDS[m.group(1).lower().replace("_", " ")]})
+    return None
+
+
+_TOOLS = {t.name: t for t in (create_task, update_task, delete_task)}
+
+
+def _render_reply(intent: Intent, result: str) -> str:
+    """Templated confirmation for a tool result, mirroring the agent's tone"""
+    task_id = intent.args.get("task_id")
+    lowered = result.lower()
+    if "not found" in lowered and task_id:
+        return f"I couldn't find Task {task_id}. Say \"show my tasks\" to see the current task numbers."
+    if lowered.startswith("error") or "invalid" in lowered or "not initialized" in lowered:
+        return result
+
+    reply = render_tool_reply(intent.tool, intent.args, result)
+    if reply is not None:
+        return reply
+    return result
+
+
+class FastPathStats:
+    """Hit-rate counters for the fast path on this worker"""
+
+    def __init__(self):
+        self.hits = {}
+        self.misses = 0
+        self.llm_calls_saved = 0
+
+    def record(self, intent: Optional[Intent]):
+        if intent is None:
+            self.misses += 1
+        else:
+            self.hits[intent.name] = self.hits.get(intent.name, 0) + 1
+            self.llm_calls_saved += llm_calls_avoided(intent.tool)
+
+    def snapshot(self) -> dict:
+        total_hits = sum(self.hits.values())
+        total = total_hits + self.misses
+        return {
+            "enabled": FAST_PATH_ENABLED,
+            "hits": total_hits,
+            "misses": self.misses,
+            "hit_rate": (total_hits / total) if total else 0.0,
+            "llm_calls_saved": self.llm_calls_saved,
+            "by_intent": dict(self.hits),
+        }
+
+
+fast_path_stats = FastPathStats()
+
+
+def route_message(text: str) -> Optional[Intent]:
+    """Match `text` and record the outcome; None when disabled or not matched"""
+    if not FAST_PATH_ENABLED:
+        return None
+    intent = match_intent(text)
+    fast_path_stats.record(intent)
+    return intent
+
+
+async def run_intent(intent: Intent, context: ToolContext) -> str:
+    """Execute the intent's tool directly and return the user-facing reply"""
+    with use_tool_context(context):
+        if intent.tool in ("list_tasks", "filter_tasks"):
+            # The listing tools answer the model with a compact table; users get readable lines
+            try:
+                listing = await fetch_task_listing(**intent.args)
+            except Exception as e:
+                return f"Error listing tasks: {str(e)}"
+            if listing is None:
+                return "Database not initialized"
+            return render_task_listing(listing, **intent.args)
+        result = await _TOOLS[intent.tool].ainvoke(intent.args)
+    return _render_reply(intent, str(result))
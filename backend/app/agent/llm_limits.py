@@ -0,0 +1,236 @@
+"""
+Client-side pacing and de-duplication of Gemini calls.
+
+RateLimiter keeps two token buckets per (API key, model): requests per
+minute and tokens per minute, sized to the provider's published limits.
+A call reserves capacity up front and, if the bucket is short, waits its turn;
+when the wait would run past the caller's deadline it is rejected at once
+with RateLimitExceeded instead of being sent only to come back as a 429.
+
+RequestCoalescer lets concurrent identical model calls (same model,
+normalized conversation and task-state version) share one upstream request.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from .memory import estimate_tokens
+from .runner import AgentBusyError
+from ..metrics import LLM_COALESCED_CALLS, LLM_QUEUE_WAIT_SECONDS, LLM_RATE_LIMIT_REJECTIONS
+
+
+# Defaults match the Gemini free tier for flash-lite; raise them for paid keys (0 disables)
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "250000"))
+# Longest a call may wait for bucket capacity before it is rejected
+LLM_QUEUE_DEADLINE = float(os.getenv("LLM_QUEUE_DEADLINE", "20"))
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1").lower() not in ("0", "false", "no")
+
+# Output tokens reserved per call before the real usage is known
+OUTPUT_TOKEN_RESERVE = 512
+
+
+class RateLimitExceeded(AgentBusyError):
+    """No capacity for the call within its deadline"""
+
+
+class TokenBucket:
+    """
+    Async token bucket. Reservations may drive the balance negative; each
+    caller then sleeps until its share has refilled, which queues waiters in
+    arrival order without holding a lock while sleeping.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, deadline: float) -> float:
+        """Reserve `amount` and return the seconds to wait, or raise RateLimitExceeded"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+            if wait > 0 and now + wait > deadline:
+                raise RateLimitExceeded("Model rate limit reached, please retry shortly")
+            self.tokens -= amount
+            return wait
+
+    def refund(self, amount: float):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def adjust(self, delta: float):
+        """Charge (positive) or credit (negative) the difference between estimated and actual use"""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider answered 429 despite local pacing"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """RPM and TPM buckets per (api key, model)"""
+
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._buckets: Dict[Tuple[str, str], Tuple[Optional[TokenBucket], Optional[TokenBucket]]] = {}
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.rejections = 0
+        self.total_wait_seconds = 0.0
+
+    def _get(self, key: str, model: str):
+        buckets = self._buckets.get((key, model))
+        if buckets is None:
+            with self._lock:
+                buckets = self._buckets.setdefault((key, model), (
+                    TokenBucket(self.rpm) if self.rpm > 0 else None,
+                    TokenBucket(self.tpm) if self.tpm > 0 else None,
+                ))
+        return buckets
+
+    async def acquire(self, key: str, model: str, tokens: int, deadline: float):
+        """Wait for one request and `tokens` tokens of capacity, or raise RateLimitExceeded"""
+        requests_bucket, tokens_bucket = self._get(key, model)
+        wait = 0.0
+        try:
+            if requests_bucket:
+                wait = requests_bucket.reserve(1, deadline)
+            if tokens_bucket:
+                try:
+                    wait = max(wait, tokens_bucket.reserve(tokens, deadline))
+                except RateLimitExceeded:
+                    if requests_bucket:
+                        requests_bucket.refund(1)
+                    raise
+        except RateLimitExceeded:
+            self.rejections += 1
+            LLM_RATE_LIMIT_REJECTIONS.inc(model=model)
+            raise
+        LLM_QUEUE_WAIT_SECONDS.observe(wait, model=model)
+        if wait > 0:
+            self.waits += 1
+            self.total_wait_seconds += wait
+            await asyncio.sleep(wait)
+
+    def record_usage(self, key: str, model: str, estimated: int, actual: Optional[int]):
+        _, tokens_bucket = self._get(key, model)
+        if tokens_bucket and actual:
+            tokens_bucket.adjust(actual - estimated)
+
+    def penalize(self, key: str, model: str):
+        """The provider rate-limited this key: stop local callers from piling on"""
+        for bucket in self._get(key, model):
+            if bucket:
+                bucket.drain()
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "waits": self.waits,
+            "rejections": self.rejections,
+            "total_wait_seconds": self.total_wait_seconds,
+        }
+
+
+def estimate_call_tokens(messages) -> int:
+    """Prompt estimate plus the output reserve, for TPM budgeting"""
+    return sum(estimate_tokens(str(getattr(m, "content", ""))) for m in messages) + OUTPUT_TOKEN_RESERVE
+
+
+def estimate_usage(messages, response) -> Dict[str, int]:
+    """Input/output token estimate for a call whose client reported no usage"""
+    output = str(getattr(response, "content", "") or "")
+    calls = getattr(response, "tool_calls", None) or []
+    if calls:
+        output += json.dumps(calls, sort_keys=True, default=str)
+    return {
+        "input": sum(estimate_tokens(str(getattr(m, "content", ""))) for m in messages),
+        "output": estimate_tokens(output),
+    }
+
+
+def coalesce_key(model: str, messages, summary: str = "", version=None) -> str:
+    """Stable digest of a model call's inputs; whitespace and tool-call ids are normalized away"""
+    parts = [model, summary or "", str(version)]
+    for m in messages:
+        content = getattr(m, "content", "")
+        if not isinstance(content, str):
+            content = json.dumps(content, sort_keys=True, default=str)
+        calls = [
+            (c.get("name"), json.dumps(c.get("args"), sort_keys=True, default=str))
+            for c in (getattr(m, "tool_calls", None) or []) if isinstance(c, dict)
+        ]
+        parts.append(f"{type(m).__name__}:{' '.join(content.split())}:{calls}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class RequestCoalescer:
+    """Share one in-flight upstream call between concurrent identical requests"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def run(self, key: str, call: Callable[[], Awaitable]):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            LLM_COALESCED_CALLS.inc()
+            result = await asyncio.shield(future)
+            # Each follower gets its own copy; messages are mutable pydantic models
+            return copy.deepcopy(result)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so a leader-only failure doesn't warn about an unobserved exception
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+# Global instances
+_rate_limiter = None
+_coalescer = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the per-worker rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Get or create the per-worker request coalescer"""
+    global _coalescer
+    if _coalescer is None:
+        _coalescer = RequestCoalescer()
+    return _coalescer
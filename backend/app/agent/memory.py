@@ -0,0 +1,110 @@
+"""
+Bounded, per-session conversation memory for the chat agent.
+
+Each session keeps its recent turns as (user message, final reply) pairs,
+which is all the model needs to resolve follow-ups like "mark it done". Tool
+calls and tool output are not replayed, so a long list_tasks result never
+inflates later prompts. When the recent turns exceed the token budget the
+oldest ones are folded into a short rolling summary instead of being resent
+verbatim. Sessions live in an in-memory LRU so idle ones are evicted.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for budgeting"""
+    return len(text or "") // 4 + 1
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class ConversationMemory:
+    """Recent turns of one chat session, kept within a token budget"""
+
+    def __init__(self, max_tokens: int = 2000, max_summary_tokens: int = 400):
+        self.max_tokens = max_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.turns: List[Tuple[str, str]] = []
+        self.summary_lines: List[str] = []
+        self.last_used = time.monotonic()
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def messages(self) -> list:
+        """Recent turns as chat messages, oldest first"""
+        history = []
+        for user_text, reply_text in self.turns:
+            history.append(HumanMessage(content=user_text))
+            history.append(AIMessage(content=reply_text))
+        return history
+
+    def add_turn(self, user_text: str, reply_text: str):
+        self.turns.append((user_text, reply_text))
+        self.last_used = time.monotonic()
+        self._trim()
+
+    def _turn_tokens(self) -> int:
+        return sum(estimate_tokens(u) + estimate_tokens(r) for u, r in self.turns)
+
+    def _trim(self):
+        # Always keep the latest turn verbatim; fold older ones into the summary
+        while len(self.turns) > 1 and self._turn_tokens() > self.max_tokens:
+            user_text, reply_text = self.turns.pop(0)
+            self.summary_lines.append(f"- User: {_clip(user_text, 120)} -> Assistant: {_clip(reply_text, 160)}")
+
+        while len(self.summary_lines) > 1 and estimate_tokens(self.summary) > self.max_summary_tokens:
+            self.summary_lines.pop(0)
+
+
+class SessionStore:
+    """LRU of ConversationMemory objects keyed by session id"""
+
+    def __init__(self, max_sessions: Optional[int] = None, max_tokens: Optional[int] = None,
+                 idle_ttl: Optional[float] = None):
+        self.max_sessions = max_sessions or int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+        self.max_tokens = max_tokens or int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+        self.idle_ttl = idle_ttl if idle_ttl is not None else float(os.getenv("CHAT_SESSION_TTL", "3600"))
+        self._sessions: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        """Return the memory for `session_id`, creating it (and evicting stale sessions) as needed"""
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is not None and self.idle_ttl and time.monotonic() - memory.last_used > self.idle_ttl:
+                memory = None
+            if memory is None:
+                memory = ConversationMemory(max_tokens=self.max_tokens)
+                self._sessions[session_id] = memory
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return memory
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# Global instance
+_session_store = None
+
+def get_session_store() -> SessionStore:
+    """Get or create the per-worker session store"""
+    global _session_store
+    if _session_store is None:
+        _session_store = SessionStore()
+    return _session_store
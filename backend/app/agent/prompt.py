@@ -6,7 +6,9 @@ System prompts for the AI Task Management Agent.
 This file contains the instructions that guide the AI agent's behavior
 and define how it should interact with users and use the available tools.
 """
- 
+from datetime import datetime, timedelta
+from functools import lru_cache
+
 SYSTEM_PROMPT = """You are a helpful and friendly task management assistant powered by AI. 
 Your job is to help users manage their tasks through natural conversation.
 
@@ -25,13 +27,22 @@ You have access to these tools:
 1. create_task(title, description, due_date, priority) - Creates a new task with auto-assigned ID
 2. update_task(task_id, title_match, new_title, new_description, new_status, new_priority, new_due_date) - Updates a task by ID (1, 2, 3) or title
 3. delete_task(task_id, title_match) - Deletes a task by ID (1, 2, 3) or title
-4. list_tasks() - Shows all tasks with their IDs
-5. filter_tasks(status, priority) - Filters tasks by status/priority
+4. list_tasks(limit, offset, sort, fields) - Shows one page of tasks with their IDs as a compact table
+5. filter_tasks(status, priority, limit, offset, sort, fields) - Filters tasks by status/priority, paged the same way
+6. search_tasks(query, limit) - Finds the few tasks whose title or description best match a topic or keywords
+7. bulk_create_tasks(tasks) - Creates several tasks in one call
+8. bulk_update_tasks(task_ids, status, priority, all_tasks, new_status, new_priority, new_due_date) - Updates many tasks at once, selected by IDs or by current status/priority
+9. bulk_delete_tasks(task_ids, status, priority, all_tasks, confirmed) - Deletes many tasks at once, selected the same way. Deleting by status/priority or all_tasks only reports the count until called with confirmed=true, which you may do only after the user agrees
+
+Listings start with a summary such as "Showing 1-50 of 3,214 tasks; 120 overdue. More: offset=50". Only fetch the next page when the user needs tasks beyond the ones shown.
+
+Use the bulk tools whenever a request touches more than one task ("mark all high priority tasks done", "delete tasks 4, 5 and 6", "add these three tasks") instead of calling the single-task tools repeatedly.
 
 ## How Users Reference Tasks:
 - By simple ID: "delete task 1", "mark task 2 done", "update task 3"
 - By title: "delete buy milk", "mark project as done"
 - List all: "show my tasks", "list all tasks"
+- By topic: "anything about the dentist?", "find my tasks for the client demo" - use search_tasks rather than listing everything
 
 ## Response Examples:
 - "I've added 'Buy milk' to your tasks! It's Task 1 - you can reference it as 'task 1' next time."
@@ -58,15 +69,21 @@ TASK_CREATION_PROMPT = """When creating tasks, extract the following information
 If the user doesn't specify a priority, use medium as default.
 
 IMPORTANT: For dates, you MUST convert natural language to ISO format (YYYY-MM-DD).
-Current date is: {current_date}
+Use the current date given at the end of these instructions.
 Examples of date conversion:
-- "today" = {today_date}
-- "tomorrow" = {tomorrow_date}
 - "next week" = 7 days from now
 - "Friday" = next Friday's date in YYYY-MM-DD format
 - "January 15th" = 2026-01-15
 ALWAYS provide dates in YYYY-MM-DD format when calling create_task or update_task.
 """
+
+# The only part of the system prompt that changes from day to day. It is
+# appended last so everything before it is a byte-identical, cacheable prefix.
+DATE_CONTEXT_PROMPT = """## Current date:
+Current date is: {current_date}
+- "today" = {today_date}
+- "tomorrow" = {tomorrow_date}
+"""
  
 TASK_UPDATE_PROMPT = """When updating tasks, you can change:
 - Title: Rename the task
@@ -143,41 +160,54 @@ User: "Delete all completed tasks"
 You: "I found 5 completed tasks. Are you sure you want to delete all of them?"
 """
  
+@lru_cache(maxsize=2)
+def get_static_prompt(include_examples=True):
+    """
+    The date-independent part of the system prompt. Identical for every call,
+    which lets Gemini reuse it as a cached prefix.
+    """
+    base_prompt = SYSTEM_PROMPT
+
+    if include_examples:
+        base_prompt += f"\n\n{TASK_CREATION_PROMPT}"
+        base_prompt += f"\n\n{TASK_UPDATE_PROMPT}"
+        base_prompt += f"\n\n{TASK_FILTER_PROMPT}"
+        base_prompt += f"\n\n{CONVERSATIONAL_TIPS}"
+    return base_prompt
+
+
+def get_date_prompt(today=None):
+    """The dated tail of the system prompt"""
+    today = today or datetime.now().date()
+    today_str = today.strftime('%Y-%m-%d')
+    return DATE_CONTEXT_PROMPT.format(
+        current_date=today_str,
+        today_date=today_str,
+        tomorrow_date=(today + timedelta(days=1)).strftime('%Y-%m-%d'),
+    )
+
+
+@lru_cache(maxsize=4)
+def _render_system_prompt(today, include_examples):
+    return f"{get_static_prompt(include_examples)}\n\n{get_date_prompt(today)}"
+
+
 # Function to get the appropriate prompt based on context
 def get_system_prompt(include_examples=True):
     """
     Get the system prompt for the agent.
-    
+
+    The rendered prompt is memoized per day, so agent steps reuse one string
+    instead of rebuilding it.
+
     Args:
         include_examples: Whether to include example interactions
-    
+
     Returns:
         str: The system prompt
     """
-    from datetime import datetime, timedelta
-    
-    today = datetime.now().date()
-    tomorrow = (today + timedelta(days=1)).strftime('%Y-%m-%d')
-    today_str = today.strftime('%Y-%m-%d')
-    
-    # Update TASK_CREATION_PROMPT with current date info
-    task_creation_prompt = TASK_CREATION_PROMPT.format(
-        current_date=today_str,
-        today_date=today_str,
-        tomorrow_date=tomorrow
-    )
-    
-    base_prompt = SYSTEM_PROMPT
-    
-    if include_examples:
-        base_prompt += f"\n\n{task_creation_prompt}"
-        base_prompt += f"\n\n{TASK_UPDATE_PROMPT}"
-        base_prompt += f"\n\n{TASK_FILTER_PROMPT}"
-        base_prompt += f"\n\n{CONVERSATIONAL_TIPS}"
-    # print(base_prompt, "base_prompt")
-    
-    return base_prompt
- 
+    return _render_system_prompt(datetime.now().date(), include_examples)
+
 def get_error_prompt():
     """Get the error handling prompt."""
     return ERROR_HANDLING_PROMPT
@@ -0,0 +1,96 @@
+"""
+Templated user-facing replies for deterministic tool results.
+
+Used by the intent fast path and by the graph's terminal-tool mode, so a
+mutation confirmed without the LLM reads the same either way.
+"""
+import re
+from typing import Optional
+
+
+_STATUS_LABELS = {"done": "done", "in_progress": "in progress", "todo": "to do"}
+
+
+def _target(args: dict, title: Optional[str] = None) -> str:
+    if args.get("task_id"):
+        return f"Task {args['task_id']}" + (f" '{title}'" if title else "")
+    if title:
+        return f"'{title}'"
+    return f"the task matching '{args.get('title_match')}'"
+
+
+def _quoted(result: str) -> Optional[str]:
+    m = re.search(r"'(.*)'", result)
+    return m.group(1) if m else None
+
+
+def render_tool_reply(name: str, args: dict, result: str) -> Optional[str]:
+    """
+    Confirmation text for a successful create/update/delete, or None when the
+    result is not a plain success (errors and misses are left to the caller).
+    """
+    args = args or {}
+    if "successfully" not in (result or "").lower():
+        return None
+
+    if name == "create_task":
+        number = re.search(r"Task ID: (\d+)", result)
+        title = _quoted(result) or args.get("title")
+        details = []
+        if args.get("priority") and args["priority"].lower() != "medium":
+            details.append(f"{args['priority'].lower()} priority")
+        # The stored date, from the result: the model's argument may not be what was saved
+        due = re.search(r"due (\d{4}-\d{2}-\d{2})", result)
+        if due:
+            details.append(f"due {due.group(1)}")
+        extra = f" ({', '.join(details)})" if details else ""
+        if number:
+            return f"I've added '{title}' to your tasks{extra}! It's Task {number.group(1)}."
+        return f"I've added '{title}' to your tasks{extra}!"
+
+    if name == "update_task":
+        target = _target(args)
+        status = (args.get("new_status") or "").lower()
+        other = [f for f in ("new_title", "new_description", "new_priority", "new_due_date") if args.get(f)]
+        if status and not other:
+            if status == "done":
+                return f"Great job! I've marked {target} as done."
+            return f"Got it! I've marked {target} as {_STATUS_LABELS.get(status, status)}."
+        if other == ["new_priority"] and not status:
+            return f"Got it! {target} is now {args['new_priority'].lower()} priority."
+        changes = [f.replace("new_", "").replace("_", " ") for f in other]
+        if status:
+            changes.insert(0, "status")
+        return f"Got it! I've updated the {', '.join(changes)} of {target}."
+
+    if name == "delete_task":
+        return f"Done! {_target(args, _quoted(result))} has been deleted."
+
+    if name in ("bulk_create_tasks", "bulk_update_tasks", "bulk_delete_tasks"):
+        # "Created 3 tasks successfully: ..." -> "Done! Created 3 tasks: ..."
+        return "Done! " + result.replace(" successfully", "", 1)
+
+    return None
+
+
+def render_task_listing(listing, status: Optional[str] = None, priority: Optional[str] = None) -> str:
+    """User-facing list for a TaskListing page (the agent tools return a table meant for the model)"""
+    label = " ".join(w for w in (_STATUS_LABELS.get(status or "", status), f"{priority} priority" if priority else None) if w)
+    noun = f"{label} tasks" if label else "tasks"
+    if not listing.tasks:
+        return f"You don't have any {noun}." if label else "You don't have any tasks yet."
+
+    lines = []
+    for task in listing.tasks:
+        status_value = getattr(task.get("status"), "value", task.get("status"))
+        priority_value = getattr(task.get("priority"), "value", task.get("priority"))
+        due = f", due {task['due_date'].strftime('%Y-%m-%d')}" if task.get("due_date") else ""
+        lines.append(f"[Task {task.get('task_number', '?')}] {task.get('title')} | "
+                     f"{_STATUS_LABELS.get(status_value, status_value)} | {priority_value} priority{due}")
+
+    shown = len(listing.tasks)
+    header = f"Here are your {noun}" if shown == listing.total else f"Here are the first {shown} of your {listing.total:,} {noun}"
+    if listing.overdue:
+        header += f" ({listing.overdue:,} overdue)"
+    footer = "" if shown == listing.total else "\n\nAsk for the next ones to see more."
+    return header + ":\n" + "\n".join(lines) + footer
@@ -0,0 +1,105 @@
+"""
+Cache of final chat replies to read-only questions.
+
+A question such as "show my tasks" or "what's high priority?" has the same
+answer until the task list changes, so its reply is cached under the
+normalized message, today's date and the tasks version (see
+counters.get_tasks_version). Any mutation bumps the version, which makes
+every older entry unreachable; LRU eviction and a TTL bound the memory.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+
+REPLY_CACHE_SIZE = int(os.getenv("CHAT_REPLY_CACHE_SIZE", "256"))
+REPLY_CACHE_TTL = float(os.getenv("CHAT_REPLY_CACHE_TTL", "300"))
+
+_QUESTION = re.compile(
+    r"^(?:please\s+|can you\s+|could you\s+)?"
+    r"(?:what|which|how many|show|list|display|view|get|give me|tell me|do i have|are there|any|find|search)\b",
+    re.I,
+)
+# Words that change tasks, or point back at earlier turns ("delete them", "what about that one")
+_NOT_STANDALONE = re.compile(
+    r"\b(?:add|create|new|delete|remove|update|edit|mark|set|change|complete|finish|start|rename|move|make|"
+    r"it|its|them|they|that|those|this|these|above|previous|again|else|instead)\b",
+    re.I,
+)
+
+
+def normalize_message(text: str) -> str:
+    return " ".join((text or "").lower().strip().rstrip("?!. ").split())
+
+
+def is_read_only_query(text: str) -> bool:
+    """True for short, self-contained questions about tasks whose answer depends only on the task list"""
+    text = normalize_message(text)
+    return 0 < len(text) <= 120 and bool(_QUESTION.match(text)) and not _NOT_STANDALONE.search(text)
+
+
+class ReplyCache:
+    """LRU + TTL map of (normalized message, day, tasks version) -> reply"""
+
+    def __init__(self, max_entries: int = REPLY_CACHE_SIZE, ttl: float = REPLY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def _key(self, message: str, version: int) -> tuple:
+        return normalize_message(message), date.today().isoformat(), version
+
+    def get(self, message: str, version: int) -> Optional[str]:
+        key = self._key(message, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, message: str, version: int, reply: str):
+        if not self.enabled:
+            return
+        key = self._key(message, version)
+        with self._lock:
+            self._entries[key] = (reply, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+        }
+
+
+# Global instance
+_reply_cache = None
+
+def get_reply_cache() -> ReplyCache:
+    """Get or create the per-worker reply cache"""
+    global _reply_cache
+    if _reply_cache is None:
+        _reply_cache = ReplyCache()
+    return _reply_cache
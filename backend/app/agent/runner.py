@@ -0,0 +1,120 @@
+"""
+Bounded execution of agent runs.
+
+AgentRunner limits how many agent runs execute at once on a worker and how
+many may wait for a slot, and rejects work beyond that so callers can reply
+with a "busy" message instead of piling up. The graph and its tools are async,
+so runs execute on the event loop inside a slot (`slot` / `run_async`).
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+
+class AgentBusyError(RuntimeError):
+    """Raised when the runner has no free slot and its wait queue is full"""
+
+
+class AgentRunner:
+    """Runs agent invocations under a concurrency limit with admission control"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+        if max_queue is None:
+            max_queue = int(os.getenv("CHAT_MAX_QUEUE", "32"))
+        if queue_timeout is None:
+            queue_timeout = float(os.getenv("CHAT_QUEUE_TIMEOUT", "30"))
+
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout if queue_timeout > 0 else None
+
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+        # Counters are only touched from the event loop thread, so no lock is needed
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+        self.admitted = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one execution slot for the duration of the block.
+
+        Raises AgentBusyError when all slots are taken and the wait queue is
+        full, or when no slot frees up within `queue_timeout` seconds.
+        """
+        wait_started = time.perf_counter()
+        if self._slots.locked():
+            # Every slot is busy: wait in the queue if there is room, otherwise push back
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise AgentBusyError("Agent runner is at capacity")
+            self.queued += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self.queued)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AgentBusyError("Timed out waiting for a free agent slot")
+            finally:
+                self.queued -= 1
+        else:
+            await self._slots.acquire()
+        self.total_wait_seconds += time.perf_counter() - wait_started
+
+        self.admitted += 1
+        self.running += 1
+        run_started = time.perf_counter()
+        try:
+            yield
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.total_run_seconds += time.perf_counter() - run_started
+            self._slots.release()
+
+    async def run_async(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await `func(*args, **kwargs)` on the event loop once a slot is free"""
+        async with self.slot():
+            return await func(*args, **kwargs)
+
+    def stats(self) -> dict:
+        """Snapshot of concurrency, queue depth and throughput counters"""
+        finished = self.completed + self.failed
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_run_seconds": (self.total_run_seconds / finished) if finished else 0.0,
+            "avg_wait_seconds": (self.total_wait_seconds / self.admitted) if self.admitted else 0.0,
+        }
+
+
+# Global instance
+_agent_runner = None
+
+def get_agent_runner() -> AgentRunner:
+    """Get or create the per-worker agent runner"""
+    global _agent_runner
+    if _agent_runner is None:
+        _agent_runner = AgentRunner()
+    return _agent_runner
@@ -1,51 +1,182 @@
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Any
+from datetime import datetime, time
+from dataclasses import dataclass
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import os
 from langchain.tools import tool
+from langchain_core.pydantic_v1 import BaseModel
 from ..models import TaskStatus, TaskPriority
+from ..repository import TaskRepository
+from ..titles import pick_match, describe_candidates
+from ..search import search_tasks as find_tasks
+from ..metrics import timed_tool
+from .memory import estimate_tokens
 
+# Listing tools return one page of rows; the page is cut short at the token
+# budget so a large collection never floods the prompt
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+LIST_TOKEN_BUDGET = int(os.getenv("AGENT_LIST_TOKEN_BUDGET", "1500"))
+DESCRIPTION_CELL_CHARS = 80
 
-_db_session = None
+
+@dataclass
+class ToolContext:
+    """Per-invocation state the tools run against"""
+    db: Any  # motor database
+
+    user_id: Optional[str] = None
+    request_id: Optional[str] = None
+
+
+# Context of the agent run executing on the current thread / task
+_tool_context: ContextVar[Optional[ToolContext]] = ContextVar("tool_context", default=None)
+
+# Fallback for scripts that drive the tools without a per-run context
+_default_context: Optional[ToolContext] = None
 
 def set_db_session(db):
-    global _db_session
-    _db_session = db
-    
+    """Set a process-wide fallback (motor) database, for scripts and tests only.
+    Chat sessions pass a ToolContext per run instead (see use_tool_context)."""
+    global _default_context
+    _default_context = ToolContext(db=db) if db is not None else None
+
+@contextmanager
+def use_tool_context(context: Optional[ToolContext]):
+    """Bind `context` for tool calls made inside the block"""
+    token = _tool_context.set(context)
+    try:
+        yield context
+    finally:
+        _tool_context.reset(token)
+
+def get_tool_context() -> Optional[ToolContext]:
+    return _tool_context.get() or _default_context
+
+def _get_repository() -> Optional[TaskRepository]:
+    context = get_tool_context()
+    return TaskRepository(context.db) if context and context.db is not None else None
+
+async def _title_query(repo: TaskRepository, title_match: str):
+    """(query, None) for the task `title_match` clearly names, else (None, reply listing the candidates)"""
+    ranked = await repo.match_title(title_match)
+    match = pick_match(ranked)
+    if match is None:
+        return None, describe_candidates(title_match, ranked)
+    return {"_id": match["_id"]}, None
+
+def _date_cell(value) -> str:
+    return value.strftime("%Y-%m-%d") if value else ""
+
+def _text_cell(value, limit: int = 0) -> str:
+    """Single-line cell; the column separator inside values is replaced"""
+    text = " ".join(str(getattr(value, "value", value) if value is not None else "").split()).replace("|", "/")
+    return text if not limit or len(text) <= limit else text[:limit - 1] + "…"
+
+# Table column -> (stored field, formatter)
+_COLUMNS = {
+    "title": ("title", lambda t: _text_cell(t.get("title"))),
+    "status": ("status", lambda t: _text_cell(t.get("status"))),
+    "priority": ("priority", lambda t: _text_cell(t.get("priority"))),
+    "due": ("due_date", lambda t: _date_cell(t.get("due_date"))),
+    "description": ("description", lambda t: _text_cell(t.get("description"), DESCRIPTION_CELL_CHARS)),
+    "created": ("created_at", lambda t: _date_cell(t.get("created_at"))),
+    "updated": ("updated_at", lambda t: _date_cell(t.get("updated_at"))),
+}
+DEFAULT_COLUMNS = ("title", "status", "priority", "due")
+
+# sort argument -> stored field; task_number breaks ties so pages don't overlap
+_SORT_FIELDS = {
+    "task_number": "task_number",
+    "due_date": "due_date",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+    "title": "title_norm",
+}
+
+def _table_columns(fields: Optional[List[str]]):
+    """(columns, error message)"""
+    columns = [f.strip().lower() for f in fields or DEFAULT_COLUMNS if f and f.strip()]
+    columns = [{"due_date": "due", "created_at": "created", "updated_at": "updated"}.get(c, c) for c in columns]
+    unknown = [c for c in columns if c not in _COLUMNS]
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}. Use: {', '.join(_COLUMNS)}"
+    return list(dict.fromkeys(columns)) or list(DEFAULT_COLUMNS), None
+
+def _sort_spec(sort: Optional[str]):
+    """(Mongo sort, error message)"""
+    sort = (sort or "task_number").strip().lower()
+    direction = -1 if sort.startswith("-") else 1
+    field = _SORT_FIELDS.get(sort.lstrip("-"))
+    if field is None:
+        return None, f"Invalid sort '{sort}'. Use one of: {', '.join(_SORT_FIELDS)} (prefix - for descending)"
+    if field == "task_number":
+        return [("task_number", direction)], None
+    return [(field, direction), ("task_number", direction)], None
+
+def _render_table(tasks: List[dict], columns: List[str], budget: int):
+    """
+    Pipe-separated table of `tasks`, stopping before the row that would take
+    it past `budget` tokens (at least one row is always kept). Returns the
+    text and the number of rows it holds.
+    """
+    lines = ["#|" + "|".join(columns)]
+    used = estimate_tokens(lines[0])
+    for task in tasks:
+        line = f"{task.get('task_number', '?')}|" + "|".join(_COLUMNS[c][1](task) for c in columns)
+        used += estimate_tokens(line)
+        if used > budget and len(lines) > 1:
+            break
+        lines.append(line)
+    return "\n".join(lines), len(lines) - 1
+
+def _new_task_doc(title: str, description: Optional[str] = None,
+                  due_date: Optional[str] = None, priority: Optional[str] = "medium") -> dict:
+    doc = {
+        "title": title,
+        "description": description,
+        "priority": TaskPriority(priority.lower()).value if priority else TaskPriority.MEDIUM.value,
+        "status": TaskStatus.TODO.value,
+    }
+
+    if due_date:
+        doc["due_date"] = _parse_due_date(due_date)
+    return doc
+
+def _parse_due_date(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid due date '{value}', use YYYY-MM-DD") from None
+
+def _created_message(doc: dict) -> str:
+    """create_task's result, describing the task as stored"""
+    due = f", due {doc['due_date'].strftime('%Y-%m-%d')}" if doc.get("due_date") else ""
+    return f"Task created successfully: '{doc['title']}' (Task ID: {doc['task_number']}{due})"
+
 @tool
-def create_task(title: str, description: Optional[str] = None, 
+@timed_tool
+async def create_task(title: str, description: Optional[str] = None, 
                 due_date: Optional[str] = None, priority: Optional[str] = "medium") -> str:
     """Create a new task with title, optional description, due_date, and priority.
     Priority can be: low, medium, or high.
     Due date should be in format: YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"""
     try:
-        if _db_session is None:
+        repo = _get_repository()
+        if repo is None:
             return "Database not initialized"
 
-
-        last_task = _db_session.tasks.find_one(sort=[("task_number", -1)])
-        task_number = (last_task.get("task_number", 0) if last_task else 0) + 1
-
-        doc = {
-            "task_number": task_number,
-            "title": title,
-            "description": description,
-            "priority": TaskPriority(priority.lower()).value if priority else TaskPriority.MEDIUM.value,
-            "status": TaskStatus.TODO.value,
-            "created_at": datetime.utcnow(),
-        }
-
-        if due_date:
-            try:
-                doc["due_date"] = datetime.fromisoformat(due_date)
-            except Exception:
-                pass
-
-        res = _db_session.tasks.insert_one(doc)
-        return f"Task created successfully: '{title}' (Task ID: {task_number})"
+        doc = _new_task_doc(title, description, due_date, priority)
+        created = await repo.create(doc)
+        return _created_message(created)
     except Exception as e:
         return f"Error creating task: {str(e)}"
 
 @tool
-def update_task(task_id: Optional[str] = None, title_match: Optional[str] = None,
+@timed_tool
+async def update_task(task_id: Optional[str] = None, title_match: Optional[str] = None,
                 new_title: Optional[str] = None, new_description: Optional[str] = None,
                 new_status: Optional[str] = None, new_priority: Optional[str] = None,
                 new_due_date: Optional[str] = None) -> str:
@@ -53,25 +184,19 @@ def update_task(task_id: Optional[str] = None, title_match: Optional[str] = None
     Status can be: todo, in_progress, or done.
     Priority can be: low, medium, or high."""
     try:
-        if _db_session is None:
+        repo = _get_repository()
+        if repo is None:
             return "Database not initialized"
 
         query = {}
         if task_id:
-            try:
-             
-                task_num = int(task_id)
-                query["task_number"] = task_num
-            except ValueError:
-              
-                try:
-                    from bson import ObjectId
-                    query["_id"] = ObjectId(task_id)
-                except Exception:
-                    return "Invalid task id"
+            query = TaskRepository.id_query(task_id)
+            if query is None:
+                return "Invalid task id"
         elif title_match:
-            import re
-            query["title"] = {"$regex": title_match, "$options": "i"}
+            query, reply = await _title_query(repo, title_match)
+            if query is None:
+                return reply
         else:
             return "Please provide either task_id or title_match"
 
@@ -85,17 +210,12 @@ def update_task(task_id: Optional[str] = None, title_match: Optional[str] = None
         if new_priority:
             update["priority"] = TaskPriority(new_priority.lower()).value
         if new_due_date:
-            try:
-                update["due_date"] = datetime.fromisoformat(new_due_date)
-            except Exception:
-                pass
+            update["due_date"] = _parse_due_date(new_due_date)
 
         if not update:
             return "No updates provided"
 
-        update["updated_at"] = datetime.utcnow()
-
-        res = _db_session.tasks.find_one_and_update(query, {"$set": update})
+        res = await repo.update(query, update)
         if not res:
             return "Task not found"
         return f"Task updated successfully"
@@ -103,88 +223,331 @@ def update_task(task_id: Optional[str] = None, title_match: Optional[str] = None
         return f"Error updating task: {str(e)}"
 
 @tool
-def delete_task(task_id: Optional[str] = None, title_match: Optional[str] = None) -> str:
+@timed_tool
+async def delete_task(task_id: Optional[str] = None, title_match: Optional[str] = None) -> str:
     """Delete a task by ID or title match."""
     try:
-        if _db_session is None:
+        repo = _get_repository()
+        if repo is None:
             return "Database not initialized"
 
         query = {}
         if task_id:
-            try:
-            
-                task_num = int(task_id)
-                query["task_number"] = task_num
-            except ValueError:
-             
-                try:
-                    from bson import ObjectId
-                    query["_id"] = ObjectId(task_id)
-                except Exception:
-                    return "Invalid task id"
+            query = TaskRepository.id_query(task_id)
+            if query is None:
+                return "Invalid task id"
         elif title_match:
-            query["title"] = {"$regex": title_match, "$options": "i"}
+            query, reply = await _title_query(repo, title_match)
+            if query is None:
+                return reply
         else:
             return "Please provide either task_id or title_match"
 
-        res = _db_session.tasks.find_one_and_delete(query)
+        res = await repo.delete(query)
         if not res:
             return "Task not found"
         return f"Task deleted successfully: '{res.get('title')}'"
     except Exception as e:
         return f"Error deleting task: {str(e)}"
 
+@dataclass
+class TaskListing:
+    """One page of tasks plus the counts its summary line reports"""
+    tasks: List[dict]
+    total: int
+    overdue: int
+    offset: int
+
+def _filter_query(status: Optional[str] = None, priority: Optional[str] = None) -> dict:
+    query = {}
+    if status:
+        query["status"] = TaskStatus(status.lower()).value
+    if priority:
+        query["priority"] = TaskPriority(priority.lower()).value
+    return query
+
+async def _listing_page(repo: TaskRepository, query: dict, limit: int, offset: int,
+                        sort_key: list, columns: List[str]) -> TaskListing:
+    limit = max(1, min(limit or LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT))
+    offset = max(0, offset or 0)
+    projection = {"task_number": 1, **{_COLUMNS[c][0]: 1 for c in columns}}
+    overdue = {"due_date": {"$lt": datetime.combine(datetime.utcnow().date(), time.min)},
+               "status": {"$ne": TaskStatus.DONE.value}}
+    tasks, total, overdue_count = await asyncio.gather(
+        repo.find(query, sort=sort_key, limit=limit, projection=projection, skip=offset),
+        repo.count(query),
+        repo.count({"$and": [query, overdue]} if query else overdue),
+    )
+    return TaskListing(tasks, total, overdue_count, offset)
+
+@timed_tool(name="task_listing")
+async def fetch_task_listing(status: Optional[str] = None, priority: Optional[str] = None,
+                             limit: int = LIST_DEFAULT_LIMIT) -> Optional[TaskListing]:
+    """First page of tasks in task_number order, for callers that render it for the user themselves"""
+    repo = _get_repository()
+    if repo is None:
+        return None
+    return await _listing_page(repo, _filter_query(status, priority), limit, 0,
+                               [("task_number", 1)], list(DEFAULT_COLUMNS))
+
+async def _task_listing(repo: TaskRepository, query: dict, limit: int, offset: int,
+                        sort: str, fields: Optional[List[str]]):
+    """
+    One page of a listing as a table under a summary line (total, overdue
+    count and the next offset), or None when no task matches at all.
+    """
+    columns, error = _table_columns(fields)
+    if error:
+        return error
+    sort_key, error = _sort_spec(sort)
+    if error:
+        return error
+    page = await _listing_page(repo, query, limit, offset, sort_key, columns)
+    offset = page.offset
+    if not page.tasks:
+        return None if offset == 0 or not page.total else f"No tasks at offset {offset}; there are {page.total:,}."
+
+    table, shown = _render_table(page.tasks, columns, LIST_TOKEN_BUDGET)
+    summary = f"Showing {offset + 1}-{offset + shown} of {page.total:,} tasks, sorted by {sort or 'task_number'}"
+    if page.overdue:
+        summary += f"; {page.overdue:,} overdue"
+    if offset + shown < page.total:
+        summary += f". More: offset={offset + shown}"
+    return f"{summary}\n{table}"
+
 @tool
-def list_tasks() -> str:
-    """List all tasks."""
+@timed_tool
+async def list_tasks(limit: int = LIST_DEFAULT_LIMIT, offset: int = 0, sort: str = "task_number",
+                     fields: Optional[List[str]] = None) -> str:
+    """List tasks as a compact table, one page at a time (default 50 rows, up to 200).
+    Use offset to page. sort: task_number, due_date, created_at, updated_at or title; prefix "-" for descending.
+    fields: columns from title, status, priority, due, description, created, updated (default title, status, priority, due)."""
     
     try:
-        if _db_session is None:
+        repo = _get_repository()
+        if repo is None:
             return "Database not initialized"
 
-        cursor = _db_session.tasks.find().sort("task_number", 1)
-        tasks = list(cursor)
-        if not tasks:
-            return "No tasks found"
-
-        result = f"Found {len(tasks)} tasks:\n\n"
-        for task in tasks:
-            task_num = task.get("task_number", "?")
-            due = f", Due: {task.get('due_date').strftime('%Y-%m-%d')}" if task.get('due_date') else ""
-            result += f"[Task {task_num}] {task.get('title')} | Status: {task.get('status')} | Priority: {task.get('priority')}{due}\n"
-
-        return result
+        result = await _task_listing(repo, {}, limit, offset, sort, fields)
+        return result or "No tasks found"
     except Exception as e:
         return f"Error listing tasks: {str(e)}"
 
 @tool
-def filter_tasks(status: Optional[str] = None, priority: Optional[str] = None) -> str:
-    """Filter tasks by status (todo/in_progress/done) or priority (low/medium/high)."""
+@timed_tool
+async def filter_tasks(status: Optional[str] = None, priority: Optional[str] = None,
+                       limit: int = LIST_DEFAULT_LIMIT, offset: int = 0, sort: str = "task_number",
+                       fields: Optional[List[str]] = None) -> str:
+    """Filter tasks by status (todo/in_progress/done) or priority (low/medium/high).
+    Takes the same limit, offset, sort and fields arguments as list_tasks."""
     
     try:
-        if _db_session is None:
+        repo = _get_repository()
+        if repo is None:
             return "Database not initialized"
 
-        query = {}
-        if status:
-            query["status"] = TaskStatus(status.lower()).value
-        if priority:
-            query["priority"] = TaskPriority(priority.lower()).value
+        result = await _task_listing(repo, _filter_query(status, priority), limit, offset, sort, fields)
+        return result or f"No tasks found with filters: status={status}, priority={priority}"
+    except Exception as e:
+        return f"Error filtering tasks: {str(e)}"
 
-        tasks = list(_db_session.tasks.find(query).sort("task_number", 1))
+@tool
+@timed_tool
+async def search_tasks(query: str, limit: int = 5) -> str:
+    """Search task titles and descriptions for a topic or keywords, e.g. "dentist" or "client demo".
+    Returns only the best matches (default 5, up to 20), so prefer it over list_tasks when looking for particular tasks."""
+    try:
+        repo = _get_repository()
+        if repo is None:
+            return "Database not initialized"
 
+        tasks = await find_tasks(repo, query, limit)
         if not tasks:
-            return f"No tasks found with filters: status={status}, priority={priority}"
+            return f"No tasks match '{query}'"
+
+        table, _ = _render_table(tasks, list(DEFAULT_COLUMNS), LIST_TOKEN_BUDGET)
+        return f"Top {len(tasks)} tasks matching '{query}':\n{table}"
+    except Exception as e:
+        return f"Error searching tasks: {str(e)}"
 
-        result = f"Found {len(tasks)} tasks:\n\n"
+class NewTask(BaseModel):
+    """One task for bulk_create_tasks"""
+    title: str
+    description: Optional[str] = None
+    due_date: Optional[str] = None
+    priority: Optional[str] = "medium"
+
+def _bulk_query(task_ids: Optional[List[str]], status: Optional[str],
+                priority: Optional[str], all_tasks: bool):
+    """Selector for the bulk tools; returns (query, error message)"""
+    clauses = []
+    if task_ids:
+        id_queries = [TaskRepository.id_query(task_id) for task_id in task_ids]
+        if any(q is None for q in id_queries):
+            return None, "Invalid task id"
+        clauses.append({"$or": id_queries})
+    if status:
+        clauses.append({"status": TaskStatus(status.lower()).value})
+    if priority:
+        clauses.append({"priority": TaskPriority(priority.lower()).value})
+    if not clauses and not all_tasks:
+        return None, "Please provide task_ids, a status/priority filter, or all_tasks=true"
+    if len(clauses) > 1:
+        return {"$and": clauses}, None
+    return (clauses[0] if clauses else {}), None
+
+@tool
+@timed_tool
+async def bulk_create_tasks(tasks: List[NewTask]) -> str:
+    """Create several tasks at once. Each task has a title and optional description,
+    due_date (YYYY-MM-DD) and priority (low, medium, high)."""
+    try:
+        repo = _get_repository()
+        if repo is None:
+            return "Database not initialized"
+        if not tasks:
+            return "No tasks provided"
+
+        docs = []
         for task in tasks:
-            task_num = task.get("task_number", "?")
-            due = f", Due: {task.get('due_date').strftime('%Y-%m-%d')}" if task.get('due_date') else ""
-            result += f"[Task {task_num}] {task.get('title')} | Status: {task.get('status')} | Priority: {task.get('priority')}{due}\n"
+            if isinstance(task, dict):
+                task = NewTask(**task)
+            docs.append(_new_task_doc(task.title, task.description, task.due_date, task.priority))
 
-        return result
+        created = await repo.create_many(docs)
+        listing = ", ".join(f"Task {d['task_number']} '{d['title']}'" for d in created)
+        return f"Created {len(created)} tasks successfully: {listing}"
     except Exception as e:
-        return f"Error filtering tasks: {str(e)}"
+        return f"Error creating tasks: {str(e)}"
+
+@tool
+@timed_tool
+async def bulk_update_tasks(task_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                            priority: Optional[str] = None, all_tasks: bool = False,
+                            new_status: Optional[str] = None, new_priority: Optional[str] = None,
+                            new_due_date: Optional[str] = None) -> str:
+    """Update many tasks in one operation. Select them by a list of task_ids, by current
+    status/priority (e.g. all high priority tasks), or all_tasks=true.
+    Then give new_status (todo, in_progress, done), new_priority (low, medium, high) and/or new_due_date."""
+    try:
+        repo = _get_repository()
+        if repo is None:
+            return "Database not initialized"
+
+        query, error = _bulk_query(task_ids, status, priority, all_tasks)
+        if error:
+            return error
+
+        update = {}
+        if new_status:
+            update["status"] = TaskStatus(new_status.lower()).value
+        if new_priority:
+            update["priority"] = TaskPriority(new_priority.lower()).value
+        if new_due_date:
+            update["due_date"] = _parse_due_date(new_due_date)
+        if not update:
+            return "No updates provided"
+
+        matched = await repo.update_matching(query, update)
+        if not matched:
+            return "No matching tasks found"
+        return f"Updated {matched} tasks successfully"
+    except Exception as e:
+        return f"Error updating tasks: {str(e)}"
+
+@tool
+@timed_tool
+async def bulk_delete_tasks(task_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                            priority: Optional[str] = None, all_tasks: bool = False,
+                            confirmed: bool = False) -> str:
+    """Delete many tasks in one operation, selected by a list of task_ids, by
+    status/priority (e.g. all done tasks), or all_tasks=true.
+    Deleting by status/priority or all_tasks first reports how many tasks would go;
+    call again with confirmed=true only after the user has agreed."""
+    try:
+        repo = _get_repository()
+        if repo is None:
+            return "Database not initialized"
+
+        query, error = _bulk_query(task_ids, status, priority, all_tasks)
+        if error:
+            return error
+
+        if not task_ids and not confirmed:
+            matching = await repo.count(query)
+            if not matching:
+                return "No matching tasks found"
+            return (f"This would delete {matching} tasks. Ask the user to confirm, "
+                    f"then call bulk_delete_tasks again with confirmed=true.")
+
+        deleted = await repo.delete_matching(query)
+        if not deleted:
+            return "No matching tasks found"
+        return f"Deleted {deleted} tasks successfully"
+    except Exception as e:
+        return f"Error deleting tasks: {str(e)}"
+
+@timed_tool(name="create_task_batch")
+async def create_tasks_batch(calls: List[dict]) -> List[str]:
+    """
+    Run several create_task calls with a single insert. Returns the result
+    string create_task would have produced for each call, in order.
+    """
+    repo = _get_repository()
+    if repo is None:
+        return ["Database not initialized"] * len(calls)
+
+    results: List[Optional[str]] = [None] * len(calls)
+    docs, positions = [], []
+    for i, args in enumerate(calls):
+        try:
+            docs.append(_new_task_doc(**args))
+            positions.append(i)
+        except Exception as e:
+            results[i] = f"Error creating task: {str(e)}"
+
+    try:
+        created = await repo.create_many(docs)
+    except Exception as e:
+        for i in positions:
+            results[i] = f"Error creating task: {str(e)}"
+        return results
+
+    for i, doc in zip(positions, created):
+        results[i] = _created_message(doc)
+    return results
+
+@timed_tool(name="delete_task_batch")
+async def delete_tasks_batch(calls: List[dict]) -> List[str]:
+    """Run several delete_task-by-id calls in one delete; results as delete_task returns them"""
+    repo = _get_repository()
+    if repo is None:
+        return ["Database not initialized"] * len(calls)
+
+    results: List[Optional[str]] = [None] * len(calls)
+    queries, positions = [], []
+    for i, args in enumerate(calls):
+        query = TaskRepository.id_query(args.get("task_id") or "")
+        if query is None:
+            results[i] = "Invalid task id"
+        else:
+            queries.append(query)
+            positions.append(i)
+
+    try:
+        removed = await repo.delete_many(queries)
+    except Exception as e:
+        for i in positions:
+            results[i] = f"Error deleting task: {str(e)}"
+        return results
+
+    for i, doc in zip(positions, removed):
+        results[i] = f"Task deleted successfully: '{doc.get('title')}'" if doc else "Task not found"
+    return results
+
+# Tools that never modify tasks
+READ_ONLY_TOOLS = frozenset({"list_tasks", "filter_tasks", "search_tasks"})
 
 def get_all_tools():
-    return [create_task, update_task, delete_task, list_tasks, filter_tasks]
+    return [create_task, update_task, delete_task, list_tasks, filter_tasks, search_tasks,
+            bulk_create_tasks, bulk_update_tasks, bulk_delete_tasks]
@@ -0,0 +1,126 @@
+"""
+Atomic sequence allocation backed by the `counters` collection.
+
+Each counter is a single document `{_id: <name>, seq: <last issued value>}`.
+Numbers are handed out with one `find_one_and_update` + `$inc`, so concurrent
+chat sessions never receive the same task_number and no scan of the tasks
+collection is needed per insert.
+
+The `tasks_version` counter is bumped after every task mutation (see
+TaskRepository); anything derived from the task list can be cached under the
+version it was computed at.
+"""
+from pymongo import ReturnDocument, UpdateOne
+from .utils.logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+TASK_NUMBER_COUNTER = "task_number"
+TASKS_VERSION_COUNTER = "tasks_version"
+
+# Databases whose task_number counter has been seeded in this process
+_seeded = set()
+
+
+def _seed_task_counter(db):
+    """Make sure the counter starts above the highest task_number already stored"""
+    last = db.tasks.find_one(
+        {"task_number": {"$type": "number"}},
+        sort=[("task_number", -1)],
+        projection={"task_number": 1},
+    )
+    highest = last.get("task_number", 0) if last else 0
+    # $max never moves the counter backwards, so reseeding is always safe
+    db.counters.update_one({"_id": TASK_NUMBER_COUNTER}, {"$max": {"seq": highest}}, upsert=True)
+    _seeded.add(db.name)
+
+
+async def _seed_task_counter_async(db):
+    last = await db.tasks.find_one(
+        {"task_number": {"$type": "number"}},
+        sort=[("task_number", -1)],
+        projection={"task_number": 1},
+    )
+    highest = last.get("task_number", 0) if last else 0
+    await db.counters.update_one({"_id": TASK_NUMBER_COUNTER}, {"$max": {"seq": highest}}, upsert=True)
+    _seeded.add(db.name)
+
+
+def allocate_task_numbers(db, count: int = 1) -> int:
+    """
+    Reserve `count` consecutive task numbers in a single round trip.
+
+    Returns the first number of the reserved block; the caller owns
+    first .. first + count - 1.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    if db.name not in _seeded:
+        _seed_task_counter(db)
+
+    counter = db.counters.find_one_and_update(
+        {"_id": TASK_NUMBER_COUNTER},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"] - count + 1
+
+
+async def allocate_task_numbers_async(db, count: int = 1) -> int:
+    """allocate_task_numbers() for a motor (async) database"""
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    if db.name not in _seeded:
+        await _seed_task_counter_async(db)
+
+    counter = await db.counters.find_one_and_update(
+        {"_id": TASK_NUMBER_COUNTER},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"] - count + 1
+
+
+async def bump_tasks_version(db) -> int:
+    """Advance the tasks version after a mutation; returns the new version"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": TASKS_VERSION_COUNTER},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+async def get_tasks_version(db) -> int:
+    """
+    Current tasks version. Read it before reading tasks: mutations bump it
+    after writing, so a result cached under this version is never older than
+    the version claims.
+    """
+    counter = await db.counters.find_one({"_id": TASKS_VERSION_COUNTER})
+    return counter["seq"] if counter else 0
+
+
+def ensure_task_counter(db):
+    """
+    Startup hook: seed the counter and number any tasks that were stored
+    without a task_number. Runs before ensure_indexes() so the unique
+    task_number index can be built.
+    """
+    _seed_task_counter(db)
+
+    missing = [d["_id"] for d in db.tasks.find({"task_number": None}, {"_id": 1}).sort("_id", 1)]
+    if missing:
+        first = allocate_task_numbers(db, len(missing))
+        db.tasks.bulk_write(
+            [
+                UpdateOne({"_id": oid, "task_number": None}, {"$set": {"task_number": first + i}})
+                for i, oid in enumerate(missing)
+            ],
+            ordered=False,
+        )
+        logger.info("Assigned task numbers to %d unnumbered task(s)", len(missing))
+
@@ -1,18 +1,40 @@
 import os
 from dotenv import load_dotenv
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from .metrics import MongoCommandMetrics
 
 load_dotenv()
 
 
 MONGO_URI = os.getenv("DATABASE_URL")
+DB_NAME = "Taskmanager"
 
-client = MongoClient(MONGO_URI)
-db =  client['Taskmanager']
+# Pool sizing for the async client that serves requests and agent tools
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+}
+
+# Feeds mongo_op_seconds for every command either client sends
+_command_listeners = [MongoCommandMetrics()]
+
+# Sync client: startup bootstrap, diagnostics and standalone scripts
+client = MongoClient(MONGO_URI, event_listeners=_command_listeners)
+db =  client[DB_NAME]
+
+# Async client: REST routes and agent tools
+async_client = AsyncIOMotorClient(MONGO_URI, event_listeners=_command_listeners, **POOL_OPTIONS)
+async_db = async_client[DB_NAME]
 
 def get_db():
     """Dependency that yields a pymongo Database instance."""
     try:
         yield db
     finally:
-        pass
\ No newline at end of file
+        pass
+
+async def get_async_db():
+    """Dependency that yields a motor (async) Database instance."""
+    yield async_db
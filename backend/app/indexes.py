@@ -0,0 +1,124 @@
+"""
+Index declarations for the tasks collection and query-plan diagnostics.
+
+TASK_INDEXES lists every index the app relies on (TOMBSTONE_INDEXES those of
+the delete log used by delta sync); ensure_indexes() creates them
+idempotently at startup. QUERY_SHAPES mirrors the queries the routers and
+agent tools issue so explain_query_shapes() can verify each one is served by an
+index rather than a COLLSCAN.
+"""
+import os
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from .utils.logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# How long deletes stay visible to delta sync (GET /api/tasks?since=...)
+TOMBSTONE_TTL_DAYS = int(os.getenv("TASK_TOMBSTONE_TTL_DAYS", "7"))
+# Delta sync re-sends changes this much older than `since`, covering writes
+# that were still in flight and clock skew between API workers
+SYNC_OVERLAP_SECONDS = float(os.getenv("TASK_SYNC_OVERLAP_SECONDS", "5"))
+
+TASK_INDEXES = [
+    # Lookups by user-facing id and uniqueness of allocated numbers
+    IndexModel([("task_number", ASCENDING)], unique=True, name="task_number_unique"),
+    # Keyset pagination order used by GET /api/tasks
+    IndexModel([("task_number", ASCENDING), ("_id", ASCENDING)], name="task_number_id"),
+    # filter_tasks / REST status+priority filters, sorted by task_number
+    IndexModel([("status", ASCENDING), ("priority", ASCENDING), ("task_number", ASCENDING)],
+               name="status_priority_task_number"),
+    # Priority-only filters can't use the status-prefixed index
+    IndexModel([("priority", ASCENDING), ("task_number", ASCENDING)], name="priority_task_number"),
+    # Due-date range filters
+    IndexModel([("due_date", ASCENDING)], name="due_date"),
+    # Free-text search over task content
+    IndexModel([("title", TEXT), ("description", TEXT)], name="title_description_text"),
+    # Title references: exact and anchored-prefix lookups on the folded title
+    IndexModel([("title_norm", ASCENDING)], name="title_norm"),
+    # Delta sync: tasks changed since a client's last sync
+    IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+]
+
+TOMBSTONE_INDEXES = [
+    # Delta sync reads deletes by time; the same index expires them
+    IndexModel([("deleted_at", ASCENDING)], name="deleted_at_ttl", expireAfterSeconds=TOMBSTONE_TTL_DAYS * 86400),
+]
+
+
+def _query_shapes():
+    """(name, filter, sort) for every query shape the app issues against db.tasks"""
+    now = datetime.utcnow()
+    return [
+        ("list_tasks", {}, [("task_number", ASCENDING)]),
+        ("page_tasks", {}, [("task_number", ASCENDING), ("_id", ASCENDING)]),
+        ("filter_status", {"status": "todo"}, [("task_number", ASCENDING)]),
+        ("filter_priority", {"priority": "high"}, [("task_number", ASCENDING)]),
+        ("filter_status_priority", {"status": "todo", "priority": "high"}, [("task_number", ASCENDING)]),
+        ("due_date_range", {"due_date": {"$gte": now, "$lte": now}}, None),
+        ("overdue_count", {"due_date": {"$lt": now}, "status": {"$ne": "done"}}, None),
+        ("lookup_task_number", {"task_number": 1}, None),
+        ("counter_seed", {"task_number": {"$type": "number"}}, [("task_number", DESCENDING)]),
+        ("text_search", {"$text": {"$search": "task"}}, None),
+        ("title_prefix", {"title_norm": {"$regex": "^buy milk"}}, [("title_norm", ASCENDING)]),
+        ("changed_since", {"updated_at": {"$gt": now}}, [("task_number", ASCENDING), ("_id", ASCENDING)]),
+    ]
+
+
+def ensure_indexes(db) -> list:
+    """
+    Create every declared index that is missing. Safe to call repeatedly:
+    MongoDB treats an identical spec as a no-op, and a conflicting one is
+    reported rather than raised so startup still succeeds.
+    """
+    results = []
+    for collection, index in [(db.tasks, i) for i in TASK_INDEXES] + [(db.task_tombstones, i) for i in TOMBSTONE_INDEXES]:
+        name = index.document["name"]
+        try:
+            collection.create_indexes([index])
+            results.append({"name": name, "ok": True})
+        except OperationFailure as exc:
+            logger.warning("Could not create index %s: %s", name, exc)
+            results.append({"name": name, "ok": False, "error": str(exc)})
+    return results
+
+
+def _collect_stages(plan, stages, index_names):
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.append(stage)
+        if plan.get("indexName"):
+            index_names.append(plan["indexName"])
+        for value in plan.values():
+            _collect_stages(value, stages, index_names)
+    elif isinstance(plan, list):
+        for value in plan:
+            _collect_stages(value, stages, index_names)
+
+
+def explain_query_shapes(db) -> list:
+    """Run explain() on each query shape and flag the ones that fall back to a COLLSCAN"""
+    report = []
+    for name, query, sort in _query_shapes():
+        cursor = db.tasks.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        except OperationFailure as exc:
+            report.append({"shape": name, "error": str(exc), "collscan": None})
+            continue
+
+        stages, index_names = [], []
+        _collect_stages(plan, stages, index_names)
+        report.append({
+            "shape": name,
+            "filter": str(query),
+            "sort": sort,
+            "stages": stages,
+            "indexes": sorted(set(index_names)),
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
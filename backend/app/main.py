@@ -1,11 +1,30 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .database import get_db
-from .routers import tasks, chat
+from fastapi.responses import PlainTextResponse
+from .utils.logging_setup import setup_logging, get_logger, correlation_scope
+from .database import get_db, db
+from .counters import ensure_task_counter
+from .indexes import ensure_indexes
+from .titles import ensure_title_norms
+from .routers import tasks, chat, diagnostics
+from .agent.runner import get_agent_runner
+from .agent.intents import fast_path_stats
+from .metrics import registry, render_metrics
 import os
 
+setup_logging()
+logger = get_logger(__name__)
+
 app = FastAPI(title="AI Task Manager API")
 
+@app.middleware("http")
+async def correlation_id_middleware(request: Request, call_next):
+    # Honour an upstream request id so logs line up across services
+    with correlation_scope(request.headers.get("x-request-id")) as correlation_id:
+        response = await call_next(request)
+    response.headers["X-Request-ID"] = correlation_id
+    return response
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -18,11 +37,46 @@ app.add_middleware(
 # Include routers
 app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
+app.include_router(diagnostics.router, prefix="/api/diagnostics", tags=["diagnostics"])
+
+@app.on_event("startup")
+def bootstrap_database():
+    try:
+        # Number legacy tasks first so the unique task_number index can build
+        ensure_task_counter(db)
+        ensure_title_norms(db)
+        ensure_indexes(db)
+    except Exception as exc:
+        # Don't block startup on an unreachable database; allocation seeds lazily
+        logger.error("Database bootstrap failed: %r", exc)
 
 @app.get("/")
 def read_root():
     return {"message": "AI Task Manager API"}
 
+def _chat_gauges():
+    runner = get_agent_runner().stats()
+    fast_path = fast_path_stats.snapshot()
+    return [
+        "# TYPE chat_runner_running gauge",
+        f"chat_runner_running {runner['running']}",
+        "# TYPE chat_runner_queued gauge",
+        f"chat_runner_queued {runner['queued']}",
+        "# TYPE chat_runner_rejected_total counter",
+        f"chat_runner_rejected_total {runner['rejected']}",
+        "# TYPE chat_fast_path_hits_total counter",
+        f"chat_fast_path_hits_total {fast_path['hits']}",
+        "# TYPE chat_fast_path_misses_total counter",
+        f"chat_fast_path_misses_total {fast_path['misses']}",
+    ]
+
+registry.add_collector(_chat_gauges)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
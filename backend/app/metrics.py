@@ -0,0 +1,257 @@
+"""
+Prometheus-style metrics for the API and the chat agent.
+
+A small in-process registry of counters and histograms rendered in the
+Prometheus text exposition format at GET /metrics. Each worker process keeps
+its own registry, so scrape every worker (or aggregate with `sum by`).
+
+Instrumentation points:
+    * TimedRoute           - REST latency per endpoint (routers/tasks.py)
+    * timed_tool           - tool execution latency per tool (agent/tools.py)
+    * observe_llm_call     - LLM latency per graph node and token usage (agent/graph.py)
+    * MongoCommandMetrics  - driver-level latency per Mongo command (database.py)
+    * chat / key manager   - WebSocket message latency, key rotations, quota errors
+    * llm_limits           - rate-limiter queueing, rejections and coalesced calls
+"""
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi import Request
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self.header()
+        lines += [f"{self.name}{_label_text(self.labelnames, k)} {v}" for k, v in items]
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[len(self.buckets)] += 1
+            row[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = self.header()
+        for key, row in items:
+            bounds = [str(b) for b in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, row):
+                labels = _label_text(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {row[-1]}")
+            lines.append(f"{self.name}_count{labels} {row[len(self.buckets)]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a callback returning ready-made exposition lines (for gauges read at scrape time)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                lines += collector()
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CHAT_MESSAGE_SECONDS = registry.register(Histogram(
+    "chat_ws_message_seconds", "Time from receiving a chat message to sending its final frame",
+    ("path", "outcome")))
+LLM_CALL_SECONDS = registry.register(Histogram(
+    "llm_call_seconds", "Latency of LLM calls per graph node", ("node", "model", "outcome")))
+# source="reported" when the client returned usage, "estimated" (chars / 4) otherwise
+LLM_TOKENS = registry.register(Histogram(
+    "llm_tokens", "Tokens per LLM call", ("node", "model", "kind", "source"), buckets=TOKEN_BUCKETS))
+LLM_TOKENS_TOTAL = registry.register(Counter(
+    "llm_tokens_total", "Tokens consumed by LLM calls", ("model", "kind", "source")))
+TOOL_CALL_SECONDS = registry.register(Histogram(
+    "tool_call_seconds", "Agent tool execution latency", ("tool", "outcome")))
+MONGO_OP_SECONDS = registry.register(Histogram(
+    "mongo_op_seconds", "MongoDB command latency as seen by the driver", ("command", "outcome")))
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_seconds", "REST request latency per endpoint", ("method", "handler", "status")))
+API_KEY_ROTATIONS = registry.register(Counter(
+    "api_key_rotations_total", "API keys taken out of rotation after a quota/auth error"))
+API_QUOTA_ERRORS = registry.register(Counter(
+    "api_quota_errors_total", "Agent runs that failed with a quota or auth error"))
+LLM_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "llm_queue_wait_seconds", "Time LLM calls waited for rate-limit capacity", ("model",)))
+LLM_RATE_LIMIT_REJECTIONS = registry.register(Counter(
+    "llm_rate_limit_rejections_total", "LLM calls rejected because no capacity was free before their deadline",
+    ("model",)))
+LLM_COALESCED_CALLS = registry.register(Counter(
+    "llm_coalesced_calls_total", "LLM calls served by an identical call already in flight"))
+
+
+def render_metrics() -> str:
+    return registry.render()
+
+
+def token_usage(response) -> Optional[Dict[str, int]]:
+    """
+    {"input": n, "output": n} as reported by the model client, or None.
+    langchain-google-genai 0.0.x reports no usage at all. Later versions put
+    Gemini's usage_metadata into response_metadata, and langchain-core 0.2+
+    adds a usage_metadata field to AIMessage.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return {"input": usage.get("input_tokens") or 0, "output": usage.get("output_tokens") or 0}
+    usage = (getattr(response, "response_metadata", None) or {}).get("usage_metadata")
+    if usage:
+        return {"input": usage.get("prompt_token_count") or 0, "output": usage.get("candidates_token_count") or 0}
+    return None
+
+
+def observe_llm_call(node: str, model: str, seconds: float, usage: Optional[Dict[str, int]] = None,
+                     source: str = "reported", outcome: str = "ok"):
+    """Record one LLM call and its token usage ({"input": n, "output": n}) when known"""
+    LLM_CALL_SECONDS.observe(seconds, node=node, model=model, outcome=outcome)
+    for kind, tokens in (usage or {}).items():
+        if tokens:
+            LLM_TOKENS.observe(tokens, node=node, model=model, kind=kind, source=source)
+            LLM_TOKENS_TOTAL.inc(tokens, model=model, kind=kind, source=source)
+
+
+def timed_tool(func=None, *, name: Optional[str] = None):
+    """
+    Time an async tool body. Tools report failures as strings, so a result
+    starting with "Error" counts as outcome="error".
+    """
+    def decorate(fn):
+        tool_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = await fn(*args, **kwargs)
+                first = result[0] if isinstance(result, list) and result else result
+                outcome = "error" if isinstance(first, str) and first.startswith("Error") else "ok"
+                return result
+            finally:
+                TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=tool_name, outcome=outcome)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+class TimedRoute(APIRoute):
+    """APIRoute that records request latency labelled by endpoint name, not the raw path"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        endpoint_name = self.name
+
+        async def timed_handler(request: Request):
+            started = time.perf_counter()
+            status = "500"
+            try:
+                response = await handler(request)
+                status = str(response.status_code)
+                return response
+            except Exception as exc:
+                status = str(getattr(exc, "status_code", 500))
+                raise
+            finally:
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, method=request.method, handler=endpoint_name, status=status
+                )
+        return timed_handler
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Driver command listener feeding mongo_op_seconds (runs inline in the driver; kept trivial)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_OP_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="ok")
+
+    def failed(self, event):
+        MONGO_OP_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name, outcome="error")
@@ -0,0 +1,262 @@
+"""
+Async data access for the tasks collection.
+
+TaskRepository wraps a motor database and is the single place the REST
+routers and the agent tools read and write tasks, so both share the same
+id resolution, defaults and timestamps. Every mutation that changes something
+also bumps the tasks version counter, and deletes leave a tombstone in
+`task_tombstones` so delta sync (GET /api/tasks?since=...) can report them.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, List, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne, DeleteOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from .counters import allocate_task_numbers_async, bump_tasks_version, get_tasks_version
+from .database import async_db
+from .indexes import TOMBSTONE_TTL_DAYS
+from .titles import MATCH_CANDIDATES, normalize_title, prefix_query, rank_titles
+from .models import TaskStatus, TaskPriority
+
+
+def _with_title_norm(fields: dict) -> dict:
+    """Keep the indexed title_norm shadow field in step with title"""
+    if fields.get("title") is not None:
+        fields["title_norm"] = normalize_title(fields["title"])
+    return fields
+
+
+class TaskRepository:
+    """Async CRUD, list and filter operations over db.tasks"""
+
+    def __init__(self, db):
+        self.db = db
+        self.tasks = db.tasks
+
+    async def _changed(self):
+        await bump_tasks_version(self.db)
+
+    async def _tombstone(self, docs: Iterable[dict]):
+        """Record deleted tasks for delta sync; a repeated delete keeps the first tombstone"""
+        now = datetime.utcnow()
+        stones = [{"_id": d["_id"], "task_number": d.get("task_number"), "deleted_at": now} for d in docs]
+        if stones:
+            try:
+                await self.db.task_tombstones.insert_many(stones, ordered=False)
+            except BulkWriteError:
+                pass
+
+    async def version(self) -> int:
+        """Current tasks version (see counters.get_tasks_version)"""
+        return await get_tasks_version(self.db)
+
+    async def changed_since(self, cutoff: datetime) -> Tuple[List[dict], List[dict]]:
+        """Tasks updated and tombstones written after `cutoff`, each in one indexed query"""
+        changed = await self.find({"updated_at": {"$gt": cutoff}}, sort=[("task_number", 1), ("_id", 1)])
+        deleted = await self.db.task_tombstones.find({"deleted_at": {"$gt": cutoff}}).to_list(length=None)
+        return changed, deleted
+
+    def tombstone_horizon(self) -> datetime:
+        """Oldest `since` for which deletes are still known"""
+        return datetime.utcnow() - timedelta(days=TOMBSTONE_TTL_DAYS)
+
+    @staticmethod
+    def id_query(task_id) -> Optional[dict]:
+        """
+        Build a lookup for a task referenced by ObjectId or task_number.
+        Returns None when `task_id` is neither.
+        """
+        task_id = str(task_id).strip()
+        if ObjectId.is_valid(task_id):
+            return {"_id": ObjectId(task_id)}
+        try:
+            return {"task_number": int(task_id)}
+        except ValueError:
+            return None
+
+    async def get(self, query: dict, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.tasks.find_one(query, projection)
+
+    async def find(self, query: Optional[dict] = None, sort=None, limit: int = 0,
+                   projection: Optional[dict] = None, skip: int = 0) -> List[dict]:
+        cursor = self.tasks.find(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=limit or None)
+
+    async def count(self, query: Optional[dict] = None) -> int:
+        return await self.tasks.count_documents(query or {})
+
+    def cursor(self, query: Optional[dict] = None, sort=None, batch_size: Optional[int] = None):
+        """Raw cursor for callers that stream results instead of collecting them"""
+        cursor = self.tasks.find(query or {})
+        if sort:
+            cursor = cursor.sort(sort)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+
+    async def match_title(self, text: str, limit: int = MATCH_CANDIDATES) -> List[Tuple[float, dict]]:
+        """
+        Ranked (score, task) candidates for a title reference: exact and
+        prefix matches on the title_norm index, else a $text search.
+        """
+        norm = normalize_title(text)
+        if not norm:
+            return []
+        docs = await self.find(prefix_query(text), sort=[("title_norm", 1)], limit=limit)
+        if not docs:
+            try:
+                docs = await self.find({"$text": {"$search": text}}, limit=limit)
+            except OperationFailure:
+                # No text index on this deployment
+                docs = []
+        return rank_titles(text, docs)
+
+    async def text_search(self, text: str, limit: int) -> List[dict]:
+        """Tasks matching `text` on the title/description text index, best textScore first"""
+        score = {"$meta": "textScore"}
+        return await self.find({"$text": {"$search": text}}, sort=[("score", score)],
+                               limit=limit, projection={"score": score})
+
+    async def create(self, data: dict) -> dict:
+        """Insert a task, assigning its task_number, defaults and timestamps"""
+        now = datetime.utcnow()
+        doc = _with_title_norm(dict(data))
+        doc["status"] = doc.get("status") or TaskStatus.TODO.value
+        doc["priority"] = doc.get("priority") or TaskPriority.MEDIUM.value
+        doc["task_number"] = await allocate_task_numbers_async(self.db)
+        doc["created_at"] = now
+        doc["updated_at"] = now
+        res = await self.tasks.insert_one(doc)
+        doc["_id"] = res.inserted_id
+        await self._changed()
+        return doc
+
+    async def create_many(self, items: List[dict]) -> List[dict]:
+        """Insert several tasks with one task_number reservation and one insert_many"""
+        if not items:
+            return []
+        now = datetime.utcnow()
+        first = await allocate_task_numbers_async(self.db, len(items))
+        docs = []
+        for offset, data in enumerate(items):
+            doc = _with_title_norm(dict(data))
+            doc["status"] = doc.get("status") or TaskStatus.TODO.value
+            doc["priority"] = doc.get("priority") or TaskPriority.MEDIUM.value
+            doc["task_number"] = first + offset
+            doc["created_at"] = now
+            doc["updated_at"] = now
+            docs.append(doc)
+        # insert_many fills in each document's _id
+        try:
+            await self.tasks.insert_many(docs, ordered=False)
+        except BulkWriteError:
+            # Unordered: the other documents were still inserted
+            await self._changed()
+            raise
+        await self._changed()
+        return docs
+
+    async def update(self, query: dict, fields: dict) -> Optional[dict]:
+        """Apply `fields` to the first matching task; returns the updated document"""
+        changes = _with_title_norm(dict(fields))
+        changes["updated_at"] = datetime.utcnow()
+        doc = await self.tasks.find_one_and_update(
+            query, {"$set": changes}, return_document=ReturnDocument.AFTER
+        )
+        if doc is not None:
+            await self._changed()
+        return doc
+
+    async def update_matching(self, query: dict, fields: dict) -> int:
+        """Apply `fields` to every matching task in one update_many; returns the match count"""
+        changes = _with_title_norm(dict(fields))
+        changes["updated_at"] = datetime.utcnow()
+        res = await self.tasks.update_many(query, {"$set": changes})
+        if res.matched_count:
+            await self._changed()
+        return res.matched_count
+
+    async def delete_matching(self, query: dict) -> int:
+        """Delete every matching task in one delete_many; returns the number removed"""
+        # Resolve ids first so each removed task gets a tombstone
+        docs = await self.tasks.find(query, {"task_number": 1}).to_list(length=None)
+        if not docs:
+            return 0
+        res = await self.tasks.delete_many({"_id": {"$in": [d["_id"] for d in docs]}})
+        await self._tombstone(docs)
+        await self._changed()
+        return res.deleted_count
+
+    async def bulk_write(self, updates: List[Tuple[dict, dict]], deletes: List[dict]) -> dict:
+        """
+        Send per-task updates (query, fields) and deletes as one unordered
+        bulk_write. Operations on the same task have no guaranteed order.
+        """
+        now = datetime.utcnow()
+        ops = [UpdateOne(query, {"$set": {**_with_title_norm(dict(fields)), "updated_at": now}}) for query, fields in updates]
+        ops += [DeleteOne(query) for query in deletes]
+        if not ops:
+            return {"matched": 0, "modified": 0, "deleted": 0}
+        doomed = []
+        if deletes:
+            doomed = await self.tasks.find({"$or": deletes}, {"task_number": 1}).to_list(length=None)
+        try:
+            res = await self.tasks.bulk_write(ops, ordered=False)
+        except BulkWriteError:
+            await self._tombstone(doomed)
+            await self._changed()
+            raise
+        if res.deleted_count:
+            await self._tombstone(doomed)
+        if res.matched_count or res.deleted_count:
+            await self._changed()
+        return {"matched": res.matched_count, "modified": res.modified_count, "deleted": res.deleted_count}
+
+    async def delete(self, query: dict) -> Optional[dict]:
+        """Delete the first matching task; returns the removed document"""
+        doc = await self.tasks.find_one_and_delete(query)
+        if doc is not None:
+            await self._tombstone([doc])
+            await self._changed()
+        return doc
+
+    async def delete_many(self, queries: List[dict]) -> List[Optional[dict]]:
+        """
+        Delete the task matched by each equality query (see id_query): one
+        find resolves every query, then each task is removed with its own
+        concurrent find_one_and_delete. Returns the removed document per query,
+        None for misses and for tasks a concurrent delete removed first; a task
+        matched by several queries is credited to the first one.
+        """
+        if not queries:
+            return []
+        docs = await self.tasks.find({"$or": queries}, {"_id": 1, "task_number": 1}).to_list(length=None)
+        matched, claimed = [], set()
+        for query in queries:
+            match = next(
+                (d for d in docs if d["_id"] not in claimed and all(d.get(k) == v for k, v in query.items())),
+                None,
+            )
+            if match is not None:
+                claimed.add(match["_id"])
+            matched.append(match)
+        if not claimed:
+            return matched
+        deleted = await asyncio.gather(*(self.tasks.find_one_and_delete({"_id": task_id}) for task_id in claimed))
+        by_id = {d["_id"]: d for d in deleted if d is not None}
+        removed = [by_id.get(m["_id"]) if m is not None else None for m in matched]
+        if by_id:
+            await self._tombstone(by_id.values())
+            await self._changed()
+        return removed
+
+async def get_task_repository():
+    """Dependency that yields a TaskRepository over the async database."""
+    yield TaskRepository(async_db)
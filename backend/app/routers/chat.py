@@ -1,13 +1,152 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
-from ..database import get_db
-from ..agent.graph import create_agent_graph
-from ..agent.tools import set_db_session
+from ..database import get_async_db
+from ..agent.graph import get_agent_graph
+from ..agent.runner import get_agent_runner, AgentBusyError
+from ..agent.memory import get_session_store
+from ..agent.intents import route_message, run_intent, fast_path_stats
+from ..agent.llm_limits import get_rate_limiter, get_request_coalescer
+from ..agent.reply_cache import get_reply_cache, is_read_only_query
+from ..agent.tools import ToolContext, READ_ONLY_TOOLS
+from ..counters import get_tasks_version
+from ..search import search_stats
 from ..utils.api_key_manager import get_api_key_manager
+from ..utils.logging_setup import get_logger, correlation_scope
+from ..metrics import CHAT_MESSAGE_SECONDS, API_QUOTA_ERRORS
 from langchain_core.messages import HumanMessage
 
 import json
+import time
+import uuid
 
 router = APIRouter()
+logger = get_logger(__name__)
+
+# Time from accept() to having an agent ready, per connection
+_connect_stats = {"count": 0, "total_seconds": 0.0, "last_seconds": 0.0, "max_seconds": 0.0}
+# Time from running the graph to the first streamed model token, per message
+_first_token_stats = {"count": 0, "total_seconds": 0.0, "last_seconds": 0.0, "max_seconds": 0.0}
+
+
+def _record_latency(stats: dict, seconds: float):
+    stats["count"] += 1
+    stats["total_seconds"] += seconds
+    stats["last_seconds"] = seconds
+    stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+def _latency_summary(stats: dict) -> dict:
+    return {**stats, "avg_seconds": (stats["total_seconds"] / stats["count"]) if stats["count"] else 0.0}
+
+
+@router.get("/stats")
+def chat_stats():
+    """Agent runner concurrency/queue counters, fast-path and reply-cache hit rates, LLM pacing and connect / first-token latency on this worker"""
+    return {
+        **get_agent_runner().stats(),
+        "fast_path": fast_path_stats.snapshot(),
+        "reply_cache": get_reply_cache().stats(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "coalescer": get_request_coalescer().stats(),
+        "search": search_stats(),
+        "connect": _latency_summary(_connect_stats),
+        "first_token": _latency_summary(_first_token_stats),
+    }
+
+
+def _content_text(content) -> str:
+    """Flatten message content, which may be a string or a list of content parts"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part if isinstance(part, str) else (part.get("text") or "")
+            for part in content
+            if isinstance(part, (str, dict))
+        )
+    return ""
+
+
+def _read_only_run(messages) -> bool:
+    """True when a run called no tools other than read-only ones and produced no error reply"""
+    for msg in messages:
+        for call in getattr(msg, "tool_calls", None) or []:
+            if call.get("name") not in READ_ONLY_TOOLS:
+                return False
+        if type(msg).__name__ == "AIMessage" and str(msg.content).startswith("Error invoking model"):
+            return False
+    return True
+
+
+def _response_text(messages) -> str:
+    # Find the last AIMessage (agent response) not ToolMessage
+    response_text = ""
+    for msg in reversed(messages):
+        if hasattr(msg, 'content') and msg.content and type(msg).__name__ == 'AIMessage':
+            response_text = _content_text(msg.content)
+            break
+    
+    # If no text response, check if tools were executed and generate a success message
+    if not response_text:
+        # Check if the last message is a ToolMessage with a successful tool result
+        for msg in reversed(messages):
+            if type(msg).__name__ == 'ToolMessage' and hasattr(msg, 'content'):
+                content = msg.content
+                # If tool executed successfully, respond positively
+                if 'successfully' in content.lower() or 'created' in content.lower():
+                    response_text = f"Great! {content}"
+                    break
+                elif 'error' not in content.lower() and 'not found' not in content.lower():
+                    response_text = content
+                    break
+    
+    if not response_text:
+        response_text = "I've processed your request. How else can I help?"
+    return response_text
+
+
+async def _stream_agent_run(websocket: WebSocket, agent, state: dict, config: dict) -> dict:
+    """
+    Run the graph while forwarding model tokens ("chunk") and tool progress
+    ("tool") to the client as `done: false` frames. Returns the final state.
+    """
+    if not hasattr(agent, "astream_events"):
+        return await agent.ainvoke(state, config)
+
+    started = time.perf_counter()
+    first_token_at = None
+    final_state = None
+    root_run_id = None
+    # langchain-core 0.1 only has the v1 event schema: no parent_ids, so the
+    # root run is the one that emits the first event
+    async for event in agent.astream_events(state, config, version="v1"):
+        kind = event["event"]
+        if root_run_id is None:
+            root_run_id = event.get("run_id")
+
+        if kind == "on_chat_model_stream":
+            # Only the agent node calls the model
+            text = _content_text(getattr(event["data"].get("chunk"), "content", ""))
+            if text:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    _record_latency(_first_token_stats, first_token_at - started)
+                await websocket.send_json({"message": text, "type": "chunk", "done": False})
+        elif kind in ("on_tool_start", "on_tool_end"):
+            await websocket.send_json({
+                "type": "tool",
+                "name": event.get("name"),
+                "status": "start" if kind == "on_tool_start" else "end",
+                "done": False,
+            })
+        elif kind == "on_chain_end" and event.get("run_id") == root_run_id:
+            # The root run's output is the graph's final state, keyed by __end__ on langgraph 0.0.x
+            output = event["data"].get("output") or {}
+            final_state = output.get("__end__", output) if isinstance(output, dict) else None
+
+    if final_state is None or "messages" not in final_state:
+        raise RuntimeError("Agent stream ended without a final state")
+    return final_state
+
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -17,37 +156,44 @@ async def websocket_endpoint(websocket: WebSocket):
     db_gen = None
     db = None
     try:
-        db_gen = get_db()
-        db = next(db_gen)
+        db_gen = get_async_db()
+        db = await anext(db_gen)
     except Exception as dep_exc:
-        print("WebSocket db dependency error:", repr(dep_exc), flush=True)
+        logger.error("WebSocket db dependency error: %r", dep_exc)
         try:
             await websocket.close(code=1011)
         except Exception:
             pass
         try:
             if db_gen:
-                db_gen.close()
+                await db_gen.aclose()
         except Exception:
             pass
         return
 
 
-    try:
-     
-        set_db_session(db)
+    runner = get_agent_runner()
+    reply_cache = get_reply_cache()
+    # Clients may pass their session id back on reconnect to keep conversation memory
+    session_id = websocket.query_params.get("session_id") or uuid.uuid4().hex
+    memory = get_session_store().get(session_id)
+    user_id = websocket.query_params.get("user_id")
 
-        agent = create_agent_graph()
+    try:
+        connect_started = time.perf_counter()
+        # Compiled graphs are cached per worker, so this is a dict lookup after the first connection
+        agent = get_agent_graph()
+        _record_latency(_connect_stats, time.perf_counter() - connect_started)
     except Exception as init_exc:
         # Log initialization error and close websocket
-        print("WebSocket init error:", repr(init_exc), flush=True)
+        logger.error("WebSocket init error: %r", init_exc)
         try:
             await websocket.close(code=1011)
         except Exception:
             pass
         try:
             if db_gen:
-                db_gen.close()
+                await db_gen.aclose()
         except Exception:
             pass
         return
@@ -56,99 +202,128 @@ async def websocket_endpoint(websocket: WebSocket):
         while True:
             try:
                 data = await websocket.receive_text()
-                print("WebSocket received raw:", data, flush=True)
             except WebSocketDisconnect:
-                print("Client disconnected")
+                logger.info("Chat client disconnected", extra={"session_id": session_id})
                 break
 
             try:
                 message_data = json.loads(data)
                 user_message = message_data.get("message", "")
             except Exception as parse_exc:
-                print("WS message parse error:", repr(parse_exc), flush=True)
+                logger.warning("WS message parse error: %r", parse_exc)
                 await websocket.send_json({"error": "invalid message"})
                 continue
 
-            # Run agent
-            try:
-                state = {"messages": [HumanMessage(content=user_message)]}
-                result = agent.invoke(state)
-                print(f"Agent result messages count: {len(result['messages'])}", flush=True)
-                
-                # Find the last AIMessage (agent response) not ToolMessage
-                response_text = ""
-                for msg in reversed(result["messages"]):
-                    print(f"  - Message type: {type(msg).__name__}, content length: {len(msg.content) if hasattr(msg, 'content') and msg.content else 0}", flush=True)
-                    if hasattr(msg, 'content') and msg.content and type(msg).__name__ == 'AIMessage':
-                        response_text = msg.content
-                        break
-                
-                # If no text response, check if tools were executed and generate a success message
-                if not response_text:
-                    # Check if the last message is a ToolMessage with a successful tool result
-                    for msg in reversed(result["messages"]):
-                        if type(msg).__name__ == 'ToolMessage' and hasattr(msg, 'content'):
-                            content = msg.content
-                            # If tool executed successfully, respond positively
-                            if 'successfully' in content.lower() or 'created' in content.lower():
-                                response_text = f"Great! {content}"
-                                break
-                            elif 'error' not in content.lower() and 'not found' not in content.lower():
-                                response_text = content
-                                break
-                
-                if not response_text:
-                    response_text = "I've processed your request. How else can I help?"
+            # Every log record for this message carries its request id
+            request_id = uuid.uuid4().hex
+            message_started = time.perf_counter()
+            with correlation_scope(request_id):
+                path = "agent"
+                # Run agent
+                try:
+                    tool_context = ToolContext(db=db, user_id=user_id, request_id=request_id)
+
+                    # Read-only questions are answered from the reply cache while the task list is unchanged
+                    tasks_version = None
+                    if reply_cache.enabled and is_read_only_query(user_message):
+                        tasks_version = await get_tasks_version(db)
+                        cached_reply = reply_cache.get(user_message, tasks_version)
+                        if cached_reply is not None:
+                            memory.add_turn(user_message, cached_reply)
+                            logger.info("Chat reply via reply cache", extra={"session_id": session_id})
+                            await websocket.send_json({"message": cached_reply, "type": "agent", "done": True})
+                            CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path="cache", outcome="ok")
+                            continue
+
+                    # Simple commands ("delete task 3", "show my tasks") skip the LLM entirely
+                    intent = route_message(user_message)
+                    if intent is not None:
+                        path = "fast"
+                        # Tool calls count against the same concurrency limit as agent runs
+                        async with runner.slot():
+                            response_text = await run_intent(intent, tool_context)
+                        if tasks_version is not None and intent.tool in READ_ONLY_TOOLS:
+                            reply_cache.put(user_message, tasks_version, response_text)
+                        memory.add_turn(user_message, response_text)
+                        logger.info("Chat reply via fast path", extra={"intent": intent.name, "session_id": session_id})
+                        await websocket.send_json({"message": response_text, "type": "agent", "done": True})
+                        CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path="fast", outcome="ok")
+                        continue
+
+                    history = memory.messages()
+                    state = {"messages": history + [HumanMessage(content=user_message)], "summary": memory.summary}
+                    config = {"configurable": {"tool_context": tool_context, "thread_id": session_id, "state_version": tasks_version}}
+                    # Cached per worker; the graph takes an API key from the pool per model call
+                    agent = get_agent_graph()
+                    # The graph is fully async (Gemini + motor), so it runs on the loop under the runner's limits
+                    async with runner.slot():
+                        result = await _stream_agent_run(websocket, agent, state, config)
+
+                    # Only look at messages produced by this run, not the replayed history
+                    run_messages = result["messages"][len(history):]
+                    response_text = _response_text(run_messages)
+                    if tasks_version is not None and _read_only_run(run_messages):
+                        reply_cache.put(user_message, tasks_version, response_text)
+                    memory.add_turn(user_message, response_text)
                 
-                print(f"Final agent response: {response_text[:100]}", flush=True)
-                await websocket.send_json({"message": response_text, "type": "agent", "done": True})
-            except Exception as run_exc:
-                print("Agent run error:", repr(run_exc), flush=True)
-                print("Agent run error full:", str(run_exc), flush=True)
+                    logger.info("Chat reply via agent", extra={"session_id": session_id, "messages": len(run_messages)})
+                    await websocket.send_json({"message": response_text, "type": "agent", "done": True})
+                    CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path="agent", outcome="ok")
+                except AgentBusyError as busy_exc:
+                    logger.warning("Agent runner busy: %s", busy_exc, extra={"runner": runner.stats()})
+                    await websocket.send_json({
+                        "message": "The assistant is handling a lot of requests right now. Please try again in a moment.",
+                        "type": "error",
+                        "done": True,
+                        "error_type": "busy"
+                    })
+                    CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path=path, outcome="busy")
+                    continue
+                except Exception as run_exc:
+                    logger.error("Agent run error: %r", run_exc, exc_info=run_exc)
                 
-                # Get API key manager to check for quota errors
-                api_key_manager = get_api_key_manager()
-                error_str = str(run_exc)
+                    # Get API key manager to check for quota errors
+                    api_key_manager = get_api_key_manager()
+                    error_str = str(run_exc)
                 
-                # Check if this is an API key quota/permission error
-                if api_key_manager.is_quota_error(error_str):
-                    # Mark current key as exhausted and try next one
-                    current_key = api_key_manager.get_active_key()
-                    if current_key:
-                        api_key_manager.mark_key_exhausted(current_key, error_str)
+                    # Check if this is an API key quota/permission error
+                    if api_key_manager.is_quota_error(error_str):
+                        API_QUOTA_ERRORS.inc()
+                        CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path="agent", outcome="quota_error")
+                        # The key pool already cooled down the failing keys and retried the rest,
+                        # so only the user-friendly message is left to send
+                        user_message = api_key_manager.get_user_friendly_error(error_str)
+                        logger.warning("API quota/auth error detected")
                     
-                    # Get user-friendly error message
-                    user_message = api_key_manager.get_user_friendly_error(error_str)
-                    print(f"API quota/auth error detected. Sending friendly message: {user_message}", flush=True)
-                    
-                    try:
-                        await websocket.send_json({
-                            "message": user_message,
-                            "type": "error",
-                            "done": True,
-                            "error_type": "api_quota"
-                        })
-                    except Exception as send_exc:
-                        print(f"Failed to send error response: {send_exc}", flush=True)
-                else:
-                    # Generic error handling for other exceptions
-                    user_message = "An error occurred while processing your request. Please try again."
-                    try:
-                        await websocket.send_json({
-                            "message": user_message,
-                            "type": "error",
-                            "done": True,
-                            "error_type": "agent_error"
-                        })
-                    except Exception as send_exc:
-                        print(f"Failed to send error response: {send_exc}", flush=True)
+                        try:
+                            await websocket.send_json({
+                                "message": user_message,
+                                "type": "error",
+                                "done": True,
+                                "error_type": "api_quota"
+                            })
+                        except Exception as send_exc:
+                            logger.warning("Failed to send error response: %s", send_exc)
+                    else:
+                        CHAT_MESSAGE_SECONDS.observe(time.perf_counter() - message_started, path="agent", outcome="error")
+                        # Generic error handling for other exceptions
+                        user_message = "An error occurred while processing your request. Please try again."
+                        try:
+                            await websocket.send_json({
+                                "message": user_message,
+                                "type": "error",
+                                "done": True,
+                                "error_type": "agent_error"
+                            })
+                        except Exception as send_exc:
+                            logger.warning("Failed to send error response: %s", send_exc)
                 
-                # Continue loop to allow further requests
-                continue
+                    # Continue loop to allow further requests
+                    continue
 
     except Exception as exc:
         # Catch-all for unexpected errors; log and close
-        print("Unexpected websocket error:", repr(exc), flush=True)
+        logger.exception("Unexpected websocket error: %r", exc)
         try:
             await websocket.close(code=1011)
         except Exception:
@@ -157,6 +332,6 @@ async def websocket_endpoint(websocket: WebSocket):
         # Ensure dependency generator is closed if present
         try:
             if db_gen:
-                db_gen.close()
+                await db_gen.aclose()
         except Exception:
             pass
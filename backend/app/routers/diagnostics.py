@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from ..database import get_db
+from ..indexes import explain_query_shapes
+
+router = APIRouter()
+
+
+@router.get("/indexes")
+def index_diagnostics(db=Depends(get_db)):
+    """Existing indexes plus the winning plan of every query shape the app issues"""
+    shapes = explain_query_shapes(db)
+    return {
+        "indexes": [
+            {"name": name, "key": info.get("key"), "unique": info.get("unique", False)}
+            for name, info in db.tasks.index_information().items()
+        ],
+        "query_shapes": shapes,
+        "collscans": [s["shape"] for s in shapes if s.get("collscan")],
+    }
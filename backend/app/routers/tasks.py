@@ -1,15 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from ..database import get_db
-from ..schemas import TaskResponse, TaskCreate, TaskUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Optional
+from ..repository import TaskRepository, get_task_repository
+from ..indexes import SYNC_OVERLAP_SECONDS
+from ..metrics import TimedRoute
+from ..models import TaskStatus, TaskPriority
+from ..schemas import TaskResponse, TaskCreate, TaskUpdate, TaskPage, TaskBulkRequest, TaskBulkResult, TaskMatch
+from ..task_events import get_task_event_hub
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import asyncio
+import base64
+import hashlib
+import csv
+import io
+import json
+import os
 
-router = APIRouter()
+# TimedRoute records http_request_seconds per endpoint
+router = APIRouter(route_class=TimedRoute)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
 
-def _doc_to_response(doc: dict) -> TaskResponse:
-    return TaskResponse(
+# Cursor batch size for streaming exports; bounds memory per request
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Seconds between keep-alive comments on idle task streams
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Keyset order used for pagination; _id breaks ties between equal task_numbers
+PAGE_SORT = [("task_number", 1), ("_id", 1)]
+
+
+def _doc_fields(doc: dict) -> dict:
+    return dict(
         id=str(doc.get("_id")),
         title=doc.get("title"),
         task_number = doc.get("task_number"),
@@ -22,82 +48,336 @@ def _doc_to_response(doc: dict) -> TaskResponse:
     )
 
 
-@router.get("/", response_model=List[TaskResponse])
-def get_tasks(db=Depends(get_db)):
-    docs = list(db.tasks.find())
-    return [_doc_to_response(d) for d in docs]
+def _doc_to_response(doc: dict) -> TaskResponse:
+    return TaskResponse(**_doc_fields(doc))
 
 
-@router.get("/{task_id}", response_model=TaskResponse)
-def get_task(task_id: str, db=Depends(get_db)):
+def _encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc.get("task_number"), str(doc["_id"])])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
     try:
-        oid = ObjectId(task_id)
+        padded = cursor + "=" * (-len(cursor) % 4)
+        task_number, oid = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if task_number is not None:
+            task_number = int(task_number)
+        return task_number, ObjectId(oid)
     except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after_cursor_query(task_number: Optional[int], oid: ObjectId) -> dict:
+    """Match documents that sort strictly after (task_number, _id) in PAGE_SORT order"""
+    if task_number is None:
+        # Tasks without a number sort first, so everything numbered comes after them
+        return {"$or": [
+            {"task_number": None, "_id": {"$gt": oid}},
+            {"task_number": {"$ne": None}},
+        ]}
+    return {"$or": [
+        {"task_number": {"$gt": task_number}},
+        {"task_number": task_number, "_id": {"$gt": oid}},
+    ]}
+
+
+def _filter_clauses(status: Optional[TaskStatus], priority: Optional[TaskPriority],
+                    due_after: Optional[datetime], due_before: Optional[datetime]) -> list:
+    clauses = []
+    if status:
+        clauses.append({"status": status.value})
+    if priority:
+        clauses.append({"priority": priority.value})
+    if due_after or due_before:
+        due_range = {}
+        if due_after:
+            due_range["$gte"] = due_after
+        if due_before:
+            due_range["$lte"] = due_before
+        clauses.append({"due_date": due_range})
+    return clauses
+
+
+def _combine(clauses: list) -> dict:
+    if len(clauses) == 1:
+        return clauses[0]
+    if clauses:
+        return {"$and": clauses}
+    return {}
+
+
+def _parse_fields(fields: Optional[str]):
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in TaskResponse.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def _etag(version: int, query_string: str) -> str:
+    """Weak validator: the tasks version plus the exact query, since each query is its own representation"""
+    digest = hashlib.sha1(query_string.encode()).hexdigest()[:12]
+    return f'W/"tasks-{version}-{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Stored timestamps are naive UTC
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@router.get("/", response_model=TaskPage)
+async def get_tasks(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    status: Optional[TaskStatus] = None,
+    priority: Optional[TaskPriority] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    since: Optional[datetime] = Query(None, description="synced_at from an earlier response: return only changes after it"),
+    repo: TaskRepository = Depends(get_task_repository),
+):
+    # Read the version before the data, so the ETag never claims a newer state than the body
+    version = await repo.version()
+    etag = _etag(version, request.url.query)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    synced_at = datetime.utcnow()
+
+    selected = _parse_fields(fields)
+    deleted = None
+    next_cursor = None
+    if since is not None:
+        if after or status or priority or due_after or due_before:
+            raise HTTPException(status_code=400, detail="since cannot be combined with filters or a cursor")
+        since = _naive_utc(since)
+        if since < repo.tombstone_horizon():
+            raise HTTPException(status_code=410, detail="since is older than the delete history; reload the full list")
+        docs, tombstones = await repo.changed_since(since - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+        deleted = [str(t["_id"]) for t in tombstones]
+    else:
+        clauses = _filter_clauses(status, priority, due_after, due_before)
+        if after:
+            clauses.append(_after_cursor_query(*_decode_cursor(after)))
+
+        query = _combine(clauses)
+
+        projection = None
+        if selected:
+            # _id is always returned; task_number is needed to build the cursor
+            projection = {f: 1 for f in selected if f != "id"}
+            projection["task_number"] = 1
+
+        # Fetch one extra document to learn whether another page exists
+        docs = await repo.find(query, sort=PAGE_SORT, limit=limit + 1, projection=projection)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        next_cursor = _encode_cursor(docs[-1]) if has_more else None
+
+    if selected:
+        items = []
+        for d in docs:
+            mapped = _doc_fields(d)
+            items.append({f: mapped[f] for f in selected})
+        content = {"items": items, "next_cursor": next_cursor, "version": version,
+                   "synced_at": synced_at, "deleted": deleted}
+        return JSONResponse(content=jsonable_encoder(content), headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return TaskPage(
+        items=[_doc_to_response(d) for d in docs],
+        next_cursor=next_cursor,
+        version=version,
+        synced_at=synced_at,
+        deleted=deleted,
+    )
+
+
+async def _iter_ndjson(cursor):
+    try:
+        async for doc in cursor:
+            yield _doc_to_response(doc).model_dump_json() + "\n"
+    finally:
+        await cursor.close()
+
+
+async def _iter_csv(cursor):
+    columns = list(TaskResponse.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    try:
+        async for doc in cursor:
+            row = _doc_to_response(doc).model_dump(mode="json")
+            writer.writerow(["" if row[c] is None else row[c] for c in columns])
+            # Hand each row to the client as soon as it is written
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    finally:
+        await cursor.close()
+
+
+@router.get("/export")
+async def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[TaskStatus] = None,
+    priority: Optional[TaskPriority] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    repo: TaskRepository = Depends(get_task_repository),
+):
+    """Stream every matching task as NDJSON (default) or CSV without buffering the collection"""
+    query = _combine(_filter_clauses(status, priority, due_after, due_before))
+    # Natural _id order is always index-backed, so the server never has to buffer a sort
+    cursor = repo.cursor(query, sort=[("_id", 1)], batch_size=EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        return StreamingResponse(
+            _iter_csv(cursor),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="tasks.csv"'},
+        )
+    return StreamingResponse(
+        _iter_ndjson(cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="tasks.ndjson"'},
+    )
+
+
+@router.get("/match", response_model=List[TaskMatch])
+async def match_tasks(
+    title: str = Query(..., min_length=1, description="Title or part of one"),
+    limit: int = Query(5, ge=1, le=20),
+    repo: TaskRepository = Depends(get_task_repository),
+):
+    """Tasks whose title best matches `title`, ranked by score (1.0 = exact match after folding)"""
+    ranked = await repo.match_title(title)
+    return [TaskMatch(task=_doc_to_response(doc), score=round(score, 3)) for score, doc in ranked[:limit]]
+
+
+def _sse_frame(event: dict) -> str:
+    payload = {"op": event["op"], "id": event["task_id"]}
+    if event["doc"] is not None:
+        payload["task"] = _doc_to_response(event["doc"]).model_dump(mode="json")
+    frame = f"event: {'resync' if event['op'] == 'resync' else 'task'}\ndata: {json.dumps(payload)}\n"
+    if event["id"]:
+        frame = f"id: {event['id']}\n" + frame
+    return frame + "\n"
+
+
+@router.get("/stream")
+async def stream_tasks(
+    request: Request,
+    resume: Optional[str] = Query(None, description="Resume token (the last event id received)"),
+):
+    """
+    Server-sent events with task deltas: `task` events carry
+    {op: insert|update|delete, id, task?}; `resync` means refetch the list.
+    EventSource resumes through Last-Event-ID on its own.
+    """
+    hub = get_task_event_hub()
+    token = resume or request.headers.get("last-event-id")
+    queue, replay = hub.subscribe(token)
+
+    async def events():
+        try:
+            # Tells a fresh client the feed is live, so it can load the full list once
+            yield f"retry: 3000\nevent: ready\ndata: {json.dumps({'resumed': bool(token)})}\n\n"
+            for event in replay:
+                yield _sse_frame(event)
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse_frame(event)
+        finally:
+            hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _task_query(task_id: str) -> dict:
+    # Accept either an ObjectId or a task_number
+    query = TaskRepository.id_query(task_id)
+    if query is None:
         raise HTTPException(status_code=400, detail="Invalid task id")
+    return query
 
-    doc = db.tasks.find_one({"_id": oid})
+
+@router.get("/{task_id}", response_model=TaskResponse)
+async def get_task(task_id: str, repo: TaskRepository = Depends(get_task_repository)):
+    doc = await repo.get(_task_query(task_id))
     if not doc:
         raise HTTPException(status_code=404, detail="Task not found")
     return _doc_to_response(doc)
 
 
 @router.post("/", response_model=TaskResponse)
-def create_task_endpoint(task: TaskCreate, db=Depends(get_db)):
-    data = task.model_dump()
-    data["status"] = data.get("status", "todo")
-    data["priority"] = data.get("priority", "medium")
-    data["created_at"] = datetime.utcnow()
-    data["updated_at"] = datetime.utcnow()
-    res = db.tasks.insert_one(data)
-    doc = db.tasks.find_one({"_id": res.inserted_id})
-    if doc:
-        return _doc_to_response(doc)
-    raise HTTPException(status_code=500, detail="Failed to create task")
+async def create_task_endpoint(task: TaskCreate, repo: TaskRepository = Depends(get_task_repository)):
+    doc = await repo.create(task.model_dump())
+    return _doc_to_response(doc)
+
+
+@router.post("/bulk", response_model=TaskBulkResult)
+async def bulk_tasks_endpoint(body: TaskBulkRequest, repo: TaskRepository = Depends(get_task_repository)):
+    """
+    Create, update and delete many tasks at once: creates go out as one
+    insert_many, updates and deletes as one unordered bulk_write.
+    """
+    updates = []
+    for item in body.update:
+        fields = item.model_dump(exclude_unset=True, exclude={"id"})
+        if not fields:
+            raise HTTPException(status_code=400, detail=f"No fields to update for task {item.id}")
+        updates.append((_task_query(item.id), fields))
+    deletes = [_task_query(task_id) for task_id in body.delete]
+
+    created = await repo.create_many([task.model_dump() for task in body.create])
+    counts = await repo.bulk_write(updates, deletes)
+    return TaskBulkResult(created=[_doc_to_response(d) for d in created], **counts)
 
 
 @router.patch("/{task_id}", response_model=TaskResponse)
-def update_task_endpoint(task_id: str, task: TaskUpdate, db=Depends(get_db)):
-    # Try to parse as ObjectId first, then try as task_number
-    query = None
-    try:
-        oid = ObjectId(task_id)
-        query = {"_id": oid}
-    except Exception:
-        # Try as task_number
-        try:
-            task_num = int(task_id)
-            query = {"task_number": task_num}
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid task id")
+async def update_task_endpoint(task_id: str, task: TaskUpdate, repo: TaskRepository = Depends(get_task_repository)):
+    query = _task_query(task_id)
 
     update_data = task.model_dump(exclude_unset=True)
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    update_data["updated_at"] = datetime.utcnow()
-
-    result = db.tasks.find_one_and_update(query, {"$set": update_data}, return_document=True)
+    result = await repo.update(query, update_data)
     if not result:
         raise HTTPException(status_code=404, detail="Task not found")
     return _doc_to_response(result)
 
 
 @router.delete("/{task_id}")
-def delete_task_endpoint(task_id: str, db=Depends(get_db)):
-    # Try to parse as ObjectId first, then try as task_number
-    query = None
-    try:
-        oid = ObjectId(task_id)
-        query = {"_id": oid}
-    except Exception:
-        # Try as task_number
-        try:
-            task_num = int(task_id)
-            query = {"task_number": task_num}
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid task id")
-
-    res = db.tasks.delete_one(query)
-    if res.deleted_count == 0:
+async def delete_task_endpoint(task_id: str, repo: TaskRepository = Depends(get_task_repository)):
+    res = await repo.delete(_task_query(task_id))
+    if not res:
         raise HTTPException(status_code=404, detail="Task not found")
-    return {"message": "Task deleted successfully"}
\ No newline at end of file
+    return {"message": "Task deleted successfully"}
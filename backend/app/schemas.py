@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict, field_serializer
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from .models import TaskStatus, TaskPriority
 
 
@@ -41,4 +41,37 @@ class TaskResponse(BaseModel):
     def serialize_datetime(self, value: Optional[datetime]) -> Optional[str]:
         if value is None:
             return None
-        return value.isoformat()
\ No newline at end of file
+        return value.isoformat()
+
+
+class TaskPage(BaseModel):
+    items: List[TaskResponse]
+    next_cursor: Optional[str] = None
+    # Tasks version the page was read at (also sent as the ETag)
+    version: Optional[int] = None
+    # Pass back as `since` to get only later changes
+    synced_at: Optional[datetime] = None
+    # Delta responses only: ids of tasks deleted since `since`
+    deleted: Optional[List[str]] = None
+
+
+class TaskMatch(BaseModel):
+    task: TaskResponse
+    score: float
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: str
+
+
+class TaskBulkRequest(BaseModel):
+    create: List[TaskCreate] = []
+    update: List[TaskBulkUpdate] = []
+    delete: List[str] = []
+
+
+class TaskBulkResult(BaseModel):
+    created: List[TaskResponse] = []
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
@@ -0,0 +1,219 @@
+"""
+Task search for the search_tasks agent tool.
+
+Two rankers are fused with reciprocal rank fusion:
+- the Mongo text index (title_description_text), which matches whole words
+  and their stems;
+- an optional in-memory vector index: cosine similarity over a NumPy matrix
+  of hashed word and character-trigram embeddings of each task's title and
+  description. It also finds partial words and typos ("grocer", "dentsit")
+  that $text misses, and needs no model or network call.
+
+The vector index is kept per worker and updated incrementally. When the tasks
+version moves, it fetches only the tasks changed since its last sync and the
+tombstones of deleted ones (the same queries delta sync uses), re-embeds
+those rows and drops deleted ones. Without NumPy, only the text index is used.
+"""
+import asyncio
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo.errors import OperationFailure
+from .indexes import SYNC_OVERLAP_SECONDS
+from .titles import normalize_title
+from .utils.logging_setup import get_logger
+
+try:
+    import numpy as np
+except ImportError:  # optional: search falls back to the text index alone
+    np = None
+
+logger = get_logger(__name__)
+
+TASK_SEARCH_VECTOR = os.getenv("TASK_SEARCH_VECTOR", "1") == "1"
+TASK_SEARCH_DIM = int(os.getenv("TASK_SEARCH_DIM", "512"))
+# Vector matches below this cosine similarity are not returned
+MIN_SIMILARITY = 0.2
+# Reciprocal rank fusion constant; larger flattens the difference between ranks
+RRF_K = 60
+MAX_RESULTS = 20
+
+# Description words count for less than title words
+_DESCRIPTION_WEIGHT = 0.5
+_TRIGRAM_WEIGHT = 0.5
+
+
+def vector_search_available() -> bool:
+    return np is not None and TASK_SEARCH_VECTOR
+
+
+def _features(text: Optional[str], weight: float):
+    """(feature, weight) pairs: each word, plus the character trigrams of each word"""
+    for word in normalize_title(text).split():
+        yield "w:" + word, weight
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            yield "c:" + padded[i:i + 3], weight * _TRIGRAM_WEIGHT
+
+
+def embed(title: Optional[str], description: Optional[str] = None, dim: int = TASK_SEARCH_DIM):
+    """Unit-length hashed embedding; crc32 keeps it identical across workers and restarts"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for text, weight in ((title, 1.0), (description, _DESCRIPTION_WEIGHT)):
+        for feature, w in _features(text, weight):
+            h = zlib.crc32(feature.encode("utf-8"))
+            # The sign bit keeps hash collisions from only ever adding up
+            vector[h % dim] += w if (h >> 31) & 1 else -w
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class TaskVectorIndex:
+    """Embedding matrix of one database's tasks, one row per task"""
+
+    def __init__(self, dim: int = TASK_SEARCH_DIM):
+        self.dim = dim
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._docs: List[dict] = []
+        self._rows: Dict[object, int] = {}
+        self._lock = asyncio.Lock()
+        self.version: Optional[int] = None
+        self.synced_at: Optional[datetime] = None
+        self.full_builds = 0
+        self.incremental_updates = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _reserve(self, rows: int):
+        if rows > self._matrix.shape[0]:
+            grown = np.zeros((max(rows, 2 * self._matrix.shape[0], 64), self.dim), dtype=np.float32)
+            grown[:len(self._docs)] = self._matrix[:len(self._docs)]
+            self._matrix = grown
+
+    def embed_all(self, docs: List[dict]):
+        """Embedding rows for `docs`; touches no index state, so it can run off the event loop"""
+        vectors = np.zeros((len(docs), self.dim), dtype=np.float32)
+        for i, doc in enumerate(docs):
+            vectors[i] = embed(doc.get("title"), doc.get("description"), self.dim)
+        return vectors
+
+    def upsert(self, docs: List[dict], vectors=None):
+        if vectors is None:
+            vectors = self.embed_all(docs)
+        self._reserve(len(self._docs) + sum(1 for d in docs if d["_id"] not in self._rows))
+        for doc, vector in zip(docs, vectors):
+            row = self._rows.get(doc["_id"])
+            if row is None:
+                row = self._rows[doc["_id"]] = len(self._docs)
+                self._docs.append(doc)
+            else:
+                self._docs[row] = doc
+            self._matrix[row] = vector
+
+    def remove(self, task_ids):
+        """Drop rows, moving the last row into each hole so the matrix stays dense"""
+        for task_id in task_ids:
+            row = self._rows.pop(task_id, None)
+            if row is None:
+                continue
+            last = len(self._docs) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._docs[row] = self._docs[last]
+                self._rows[self._docs[row]["_id"]] = row
+            self._docs.pop()
+
+    def clear(self):
+        self._docs, self._rows = [], {}
+
+    async def refresh(self, repo):
+        """Bring the index up to the current tasks version; a no-op when nothing changed"""
+        version = await repo.version()
+        if version == self.version:
+            return
+        async with self._lock:
+            if version == self.version:
+                return
+            started = datetime.utcnow()
+            # Embedding is pure-Python work per task; a worker thread keeps a full
+            # build from stalling other requests. Rows are swapped in on the loop.
+            if self.synced_at is None or self.synced_at < repo.tombstone_horizon():
+                docs = await repo.find()
+                vectors = await asyncio.to_thread(self.embed_all, docs)
+                self.clear()
+                self.upsert(docs, vectors)
+                self.full_builds += 1
+            else:
+                changed, deleted = await repo.changed_since(self.synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+                vectors = await asyncio.to_thread(self.embed_all, changed)
+                self.remove([d["_id"] for d in deleted])
+                self.upsert(changed, vectors)
+                self.incremental_updates += 1
+            self.version = version
+            self.synced_at = started
+
+    def search(self, query: str, limit: int) -> List[Tuple[float, dict]]:
+        """(cosine similarity, task) best first, at least MIN_SIMILARITY"""
+        if not self._docs or limit <= 0:
+            return []
+        scores = self._matrix[:len(self._docs)] @ embed(query, dim=self.dim)
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self._docs[i]) for i in top if scores[i] >= MIN_SIMILARITY]
+
+    def stats(self) -> dict:
+        return {
+            "tasks": len(self._docs),
+            "version": self.version,
+            "full_builds": self.full_builds,
+            "incremental_updates": self.incremental_updates,
+        }
+
+
+async def search_tasks(repo, query: str, limit: int = 5) -> List[dict]:
+    """Top `limit` tasks for `query`, text-index and vector matches fused by rank"""
+    limit = max(1, min(limit, MAX_RESULTS))
+    candidates = limit * 2
+    rankings: List[List[dict]] = []
+    try:
+        rankings.append(await repo.text_search(query, candidates))
+    except OperationFailure as exc:
+        # No text index on this deployment
+        logger.debug("Text search unavailable: %s", exc)
+    index = get_vector_index(repo.db)
+    if index is not None:
+        await index.refresh(repo)
+        rankings.append([doc for _, doc in index.search(query, candidates)])
+
+    fused: Dict[object, float] = {}
+    docs: Dict[object, dict] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            fused[doc["_id"]] = fused.get(doc["_id"], 0.0) + 1.0 / (RRF_K + rank + 1)
+            # The text search result is read from the collection, so it wins over the cached copy
+            docs.setdefault(doc["_id"], doc)
+    ordered = sorted(fused, key=lambda task_id: (-fused[task_id], docs[task_id].get("task_number") or 0))
+    return [docs[task_id] for task_id in ordered[:limit]]
+
+
+# Global instances, one per database name
+_vector_indexes: Dict[str, TaskVectorIndex] = {}
+
+def get_vector_index(db) -> Optional[TaskVectorIndex]:
+    """Get or create the per-worker vector index for `db`; None when vector search is off"""
+    if not vector_search_available():
+        return None
+    index = _vector_indexes.get(db.name)
+    if index is None:
+        index = _vector_indexes[db.name] = TaskVectorIndex()
+    return index
+
+
+def search_stats() -> dict:
+    return {
+        "vector": vector_search_available(),
+        "indexes": {name: index.stats() for name, index in _vector_indexes.items()},
+    }
@@ -0,0 +1,219 @@
+"""
+Live task change feed for GET /api/tasks/stream.
+
+One TaskEventHub per worker watches the tasks collection and fans each
+insert / update / delete out to every subscribed client, so clients apply
+deltas instead of re-downloading the list after each action.
+
+The feed comes from a MongoDB change stream when the server supports one
+(replica set / Atlas). A standalone mongod has no change streams, so the hub
+falls back to polling the tasks version counter and, when it moves, reading
+only the tasks changed and deleted since the last poll. Either way each event
+carries an opaque resume token. A client that reconnects with a token still in
+the hub's backlog gets the missed events replayed. Otherwise it is told to
+resync (refetch the list).
+"""
+import asyncio
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, List, Optional, Set, Tuple
+from .database import async_db
+from .indexes import SYNC_OVERLAP_SECONDS
+from .repository import TaskRepository
+from .utils.logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# auto = change stream when available, else polling; "change_stream" or "poll" forces one
+TASK_STREAM_MODE = os.getenv("TASK_STREAM_MODE", "auto").lower()
+TASK_STREAM_POLL_SECONDS = float(os.getenv("TASK_STREAM_POLL_SECONDS", "2"))
+# Events kept for replay to reconnecting clients
+TASK_STREAM_BACKLOG = int(os.getenv("TASK_STREAM_BACKLOG", "1000"))
+# Undelivered events per client before it is told to resync
+TASK_STREAM_QUEUE = 256
+
+_RETRY_SECONDS = 5
+
+
+def _event(token: str, op: str, task_id: str, doc: Optional[dict] = None) -> dict:
+    return {"id": token, "op": op, "task_id": task_id, "doc": doc}
+
+
+RESYNC = {"id": None, "op": "resync", "task_id": None, "doc": None}
+
+
+def _unseen(recent: dict, changed: List[dict], deleted: List[dict]) -> List[Tuple[str, str, Optional[dict]]]:
+    """
+    (op, task_id, doc) for the changed tasks and tombstones not yet in
+    `recent`, which is updated in place. Delta-sync reads overlap the previous
+    poll, so some rows come back more than once.
+    """
+    events = []
+    for doc in changed:
+        if recent.get(("task", doc["_id"])) != doc.get("updated_at"):
+            recent[("task", doc["_id"])] = doc.get("updated_at")
+            op = "insert" if doc.get("created_at") == doc.get("updated_at") else "update"
+            events.append((op, str(doc["_id"]), doc))
+    for stone in deleted:
+        if ("deleted", stone["_id"]) not in recent:
+            recent[("deleted", stone["_id"])] = stone["deleted_at"]
+            events.append(("delete", str(stone["_id"]), None))
+    return events
+
+
+class TaskEventHub:
+    """Single producer per worker; each subscriber gets its own bounded queue"""
+
+    def __init__(self, db, mode: str = TASK_STREAM_MODE, poll_interval: float = TASK_STREAM_POLL_SECONDS,
+                 backlog: int = TASK_STREAM_BACKLOG):
+        self.db = db
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.active_mode: Optional[str] = None
+        self._backlog: Deque[dict] = deque(maxlen=backlog)
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._producer: Optional[asyncio.Task] = None
+        self._resume_token = None  # last change-stream resume token
+        self._poll_state: Optional[Tuple[Optional[int], datetime, dict]] = None  # (version, synced_at, recently published)
+        self.last_token: Optional[str] = None
+        self.published = 0
+
+    def subscribe(self, resume_token: Optional[str] = None) -> Tuple[asyncio.Queue, List[dict]]:
+        """
+        Register a client. Returns its queue and the events to send first:
+        the backlog after `resume_token`, or a resync marker when the token is
+        unknown (expired or from another worker).
+        """
+        replay: List[dict] = []
+        if resume_token:
+            tokens = [e["id"] for e in self._backlog]
+            if resume_token in tokens:
+                replay = list(self._backlog)[tokens.index(resume_token) + 1:]
+            elif resume_token != self.last_token:
+                replay = [RESYNC]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=TASK_STREAM_QUEUE)
+        self._subscribers.add(queue)
+        if self._producer is None or self._producer.done():
+            self._producer = asyncio.create_task(self._run())
+        return queue, replay
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._producer is not None:
+            # Nobody is listening; the stream restarts from the last token on the next subscribe
+            self._producer.cancel()
+            self._producer = None
+
+    def publish(self, event: dict):
+        self._backlog.append(event)
+        self.last_token = event["id"]
+        self.published += 1
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: drop what it has not read and make it refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def _run(self):
+        while True:
+            try:
+                if self.mode != "poll":
+                    try:
+                        await self._watch()
+                    except Exception as exc:
+                        if self.mode == "change_stream" or self.active_mode == "change_stream":
+                            # Forced, or a working stream broke: retry it rather than switching
+                            raise
+                        logger.info("Change streams unavailable (%s); polling the tasks collection", exc)
+                        self.mode = "poll"
+                        continue
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Task event feed failed, restarting in %ss: %s", _RETRY_SECONDS, exc)
+                await asyncio.sleep(_RETRY_SECONDS)
+
+    async def _watch(self):
+        options = {"full_document": "updateLookup"}
+        if self._resume_token is not None:
+            options["resume_after"] = self._resume_token
+        async with self.db.tasks.watch(**options) as stream:
+            self.active_mode = "change_stream"
+            async for change in stream:
+                self._resume_token = change["_id"]
+                op = change.get("operationType")
+                task_id = str(change.get("documentKey", {}).get("_id"))
+                token = change["_id"].get("_data") if isinstance(change["_id"], dict) else str(change["_id"])
+                if op in ("insert", "update", "replace"):
+                    doc = change.get("fullDocument")
+                    if doc is not None:
+                        self.publish(_event(token, "insert" if op == "insert" else "update", task_id, doc))
+                elif op == "delete":
+                    self.publish(_event(token, "delete", task_id))
+                elif op in ("drop", "rename", "invalidate"):
+                    self._resume_token = None
+                    self.publish({**RESYNC, "id": token})
+                    return
+
+    async def _poll(self):
+        """
+        Fallback for standalone mongod: whenever the tasks version moves,
+        publish the tasks changed and deleted since the last poll, read with
+        the indexed delta-sync queries (TaskRepository.changed_since). The sync
+        point outlives the producer, so after a restart the first poll
+        publishes what changed while nobody listened.
+        """
+        self.active_mode = "poll"
+        repo = TaskRepository(self.db)
+        if self._poll_state is None:
+            # Rows already in the first poll's overlap window predate the feed. No
+            # version yet, so the first poll always reads what landed after this.
+            started = datetime.utcnow()
+            recent = {}
+            _unseen(recent, *await repo.changed_since(started - timedelta(seconds=SYNC_OVERLAP_SECONDS)))
+            self._poll_state = (None, started, recent)
+        version, synced_at, recent = self._poll_state
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await repo.version()
+            if current == version:
+                continue
+            started = datetime.utcnow()
+            if synced_at < repo.tombstone_horizon():
+                # Deletes that old are no longer known
+                recent = {}
+                self.publish({**RESYNC, "id": f"v{current}.0"})
+            else:
+                cutoff = synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+                changed, deleted = await repo.changed_since(cutoff)
+                recent = {key: stamp for key, stamp in recent.items() if stamp > cutoff}
+                for seq, (op, task_id, doc) in enumerate(_unseen(recent, changed, deleted), 1):
+                    self.publish(_event(f"v{current}.{seq}", op, task_id, doc))
+            version, synced_at = current, started
+            self._poll_state = (version, synced_at, recent)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.active_mode,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "backlog": len(self._backlog),
+            "last_token": self.last_token,
+        }
+
+
+# Global instance
+_task_event_hub = None
+
+def get_task_event_hub() -> TaskEventHub:
+    """Get or create the per-worker task event hub over the async database"""
+    global _task_event_hub
+    if _task_event_hub is None:
+        _task_event_hub = TaskEventHub(async_db)
+    return _task_event_hub
@@ -0,0 +1,96 @@
+"""
+Title normalization and matching for references like "delete the groceries task".
+
+Every task stores `title_norm`, a case- and accent-folded copy of its title
+with punctuation and repeated whitespace removed, indexed in ascending order.
+A title reference is resolved with an exact lookup and an anchored prefix
+match on that field (both index range scans), then, when neither finds
+anything, a $text search. Candidates are ranked with difflib so the same
+input always picks the same task, and references that fit several tasks
+about equally well are reported back instead of acting on an arbitrary one.
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+from pymongo import UpdateOne
+from .utils.logging_setup import get_logger
+
+logger = get_logger(__name__)
+
+# Candidates fetched per lookup stage
+MATCH_CANDIDATES = 20
+# A non-exact best match must score at least this and lead the runner-up by MATCH_MARGIN
+MATCH_MIN_SCORE = 0.6
+MATCH_MARGIN = 0.15
+
+
+def normalize_title(title: Optional[str]) -> str:
+    """Casefold, strip accents and punctuation, collapse whitespace"""
+    folded = unicodedata.normalize("NFKD", title or "")
+    folded = "".join(c for c in folded if not unicodedata.combining(c)).casefold()
+    return " ".join(re.sub(r"[^\w\s]", " ", folded).split())
+
+
+def prefix_query(text: str) -> dict:
+    """Anchored, escaped prefix match on title_norm; uses the index as a range scan"""
+    return {"title_norm": {"$regex": "^" + re.escape(normalize_title(text))}}
+
+
+def score_title(query_norm: str, title_norm: str) -> float:
+    """1.0 for an exact match; prefixes rank above other partial matches"""
+    if not query_norm or not title_norm:
+        return 0.0
+    if query_norm == title_norm:
+        return 1.0
+    coverage = len(query_norm) / len(title_norm)
+    if title_norm.startswith(query_norm):
+        return 0.75 + 0.24 * coverage
+    score = 0.85 * SequenceMatcher(None, query_norm, title_norm).ratio()
+    if f" {query_norm} " in f" {title_norm} ":
+        # Whole words inside the title ("milk" in "buy milk")
+        score = max(score, 0.5 + 0.3 * coverage)
+    return score
+
+
+def rank_titles(text: str, docs: List[dict]) -> List[Tuple[float, dict]]:
+    """(score, doc) best first; ties go to the lowest task_number so the order is stable"""
+    query_norm = normalize_title(text)
+    ranked = [
+        (score_title(query_norm, d.get("title_norm") or normalize_title(d.get("title"))), d)
+        for d in docs
+    ]
+    ranked.sort(key=lambda item: (-item[0], item[1].get("task_number") or 0))
+    return ranked
+
+
+def pick_match(ranked: List[Tuple[float, dict]]) -> Optional[dict]:
+    """The single task a reference clearly means, or None when there is none or it is ambiguous"""
+    if not ranked:
+        return None
+    best_score, best = ranked[0]
+    runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+    if best_score == 1.0 and runner_up < 1.0:
+        return best
+    if best_score >= MATCH_MIN_SCORE and best_score - runner_up >= MATCH_MARGIN:
+        return best
+    return None
+
+
+def describe_candidates(text: str, ranked: List[Tuple[float, dict]], limit: int = 5) -> str:
+    """Tool reply for a title reference that did not resolve to one task"""
+    if not ranked:
+        return "Task not found"
+    listing = ", ".join(f"Task {d.get('task_number')} '{d.get('title')}'" for _, d in ranked[:limit])
+    return f"Several tasks could match '{text}': {listing}. Ask which one, or use the task ID."
+
+
+def ensure_title_norms(db):
+    """Startup hook: fill title_norm for tasks stored before the field existed"""
+    missing = list(db.tasks.find({"title_norm": {"$exists": False}}, {"title": 1}))
+    if missing:
+        db.tasks.bulk_write(
+            [UpdateOne({"_id": d["_id"]}, {"$set": {"title_norm": normalize_title(d.get("title"))}}) for d in missing],
+            ordered=False,
+        )
+        logger.info("Backfilled title_norm on %d task(s)", len(missing))
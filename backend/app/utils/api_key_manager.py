@@ -1,17 +1,48 @@
 """
 API Key Manager with fallback support and error handling
+
+Keys form a thread-safe pool: each model call acquires a key (round-robin or
+least-used among keys that are available), and releases it with the outcome.
+A quota/auth failure puts the key on an exponential cooldown, after which it
+re-enters rotation on its own, and the caller can retry on the next key. A
+per-key requests-per-minute budget keeps a key out of selection before
+Gemini starts rejecting it. A transient per-minute 429 only parks the key
+for the provider's retry delay instead of escalating its cooldown.
 """
 import os
-from typing import Optional, List
+import re
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Iterable
 from datetime import datetime, timedelta
 import json
+from .logging_setup import get_logger
+from ..metrics import API_KEY_ROTATIONS
+
+logger = get_logger(__name__)
+
+# "round_robin" spreads calls evenly; "least_used" prefers the key with the fewest calls in flight
+KEY_STRATEGY = os.getenv("API_KEY_STRATEGY", "round_robin").lower()
+# Requests per minute allowed per key before it is skipped (0 = no budget)
+KEY_RPM_BUDGET = int(os.getenv("API_KEY_RPM", "0"))
+# Cooldown after the first failure, doubled per consecutive failure up to the max
+KEY_COOLDOWN_BASE = float(os.getenv("API_KEY_COOLDOWN_SECONDS", "30"))
+KEY_COOLDOWN_MAX = float(os.getenv("API_KEY_COOLDOWN_MAX_SECONDS", "3600"))
+# Pause after a per-minute 429 when the error carries no retry delay
+KEY_RATE_LIMIT_PAUSE = float(os.getenv("API_KEY_RATE_LIMIT_PAUSE_SECONDS", "15"))
+
+# Gemini says "Please retry in 34.5s." and/or "retry_delay { seconds: 34 }"
+_RETRY_DELAY_RE = re.compile(r"retry(?: in|_delay\s*\{\s*seconds:)\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
 
 class APIKeyManager:
-    """Manages multiple Google API keys with automatic fallback and quota tracking"""
+    """Manages multiple Google API keys with load spreading, cooldowns and quota tracking"""
     
     def __init__(self):
         self.keys: List[str] = []
-        self.key_status: dict = {}  # Track which keys are exhausted
+        self.key_status: dict = {}  # Per-key counters, cooldown and last error
+        self._lock = threading.Lock()
+        self._next_index = 0
         self.load_keys()
     
     def load_keys(self):
@@ -34,27 +65,131 @@ class APIKeyManager:
                 "exhausted": False,
                 "last_error": None,
                 "exhausted_at": None,
-                "request_count": 0
+                "request_count": 0,
+                "in_flight": 0,
+                "failures": 0,
+                "cooldown_until": 0.0,
+                "recent": deque(),  # monotonic timestamps of calls in the last minute
             }
         
-        print(f"Loaded {len(self.keys)} API key(s)", flush=True)
+        logger.info("Loaded %d API key(s)", len(self.keys))
+
+    def _available(self, key: str, now: float) -> bool:
+        status = self.key_status[key]
+        if status["cooldown_until"] > now:
+            return False
+        if status["exhausted"]:
+            # Cooldown elapsed: put the key back into rotation
+            status["exhausted"] = False
+            logger.info("API key re-enabled after cooldown")
+        if KEY_RPM_BUDGET:
+            recent = status["recent"]
+            while recent and now - recent[0] > 60:
+                recent.popleft()
+            if len(recent) >= KEY_RPM_BUDGET:
+                return False
+        return True
+
+    def _pick(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        now = time.monotonic()
+        excluded = set(exclude)
+        candidates = [
+            (i, key) for i, key in enumerate(self.keys)
+            if key not in excluded and self._available(key, now)
+        ]
+        if not candidates:
+            return None
+        if KEY_STRATEGY == "least_used":
+            return min(candidates, key=lambda c: (self.key_status[c[1]]["in_flight"], self.key_status[c[1]]["request_count"]))[1]
+        # Round robin: first candidate at or after the cursor
+        count = len(self.keys)
+        i, key = min(candidates, key=lambda c: (c[0] - self._next_index) % count)
+        self._next_index = (i + 1) % count
+        return key
+
+    def acquire_key(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """
+        Take a key for one model call, skipping `exclude`, cooling-down keys and
+        keys over their RPM budget. Pair with release(). Returns None when no
+        key is usable right now.
+        """
+        with self._lock:
+            key = self._pick(exclude)
+            if key is not None:
+                status = self.key_status[key]
+                status["request_count"] += 1
+                status["in_flight"] += 1
+                status["recent"].append(time.monotonic())
+            return key
+
+    def available_count(self, exclude: Iterable[str] = ()) -> int:
+        """Keys acquire_key() could hand out right now, skipping `exclude`"""
+        with self._lock:
+            now = time.monotonic()
+            excluded = set(exclude)
+            return sum(1 for key in self.keys if key not in excluded and self._available(key, now))
+
+    def return_unused(self, key: str):
+        """Undo acquire_key() for a call that was never sent (e.g. no local rate-limit capacity)"""
+        with self._lock:
+            status = self.key_status.get(key)
+            if status is None:
+                return
+            status["request_count"] = max(0, status["request_count"] - 1)
+            status["in_flight"] = max(0, status["in_flight"] - 1)
+            if status["recent"]:
+                status["recent"].pop()
+
+    def release(self, key: str, error: Optional[BaseException] = None) -> bool:
+        """
+        Return a key after a call. A quota/auth error cools the key down and
+        returns True, meaning the call may be retried on another key.
+        """
+        with self._lock:
+            status = self.key_status.get(key)
+            if status is None:
+                return False
+            status["in_flight"] = max(0, status["in_flight"] - 1)
+            if error is None:
+                status["failures"] = 0
+                return False
+        if self.is_rate_limit_error(str(error)):
+            self.mark_key_exhausted(key, str(error), cooldown=self.retry_delay(str(error)))
+            return True
+        if self.is_quota_error(str(error)):
+            self.mark_key_exhausted(key, str(error))
+            return True
+        return False
     
     def get_active_key(self) -> Optional[str]:
-        """Get the next active API key that hasn't hit quota"""
-        for key in self.keys:
-            if not self.key_status[key]["exhausted"]:
-                return key
+        """The key the next call would use (without reserving it)"""
+        with self._lock:
+            now = time.monotonic()
+            for key in self.keys[self._next_index:] + self.keys[:self._next_index]:
+                if self._available(key, now):
+                    return key
         
-        # All keys exhausted, return first one (will error again but with proper handling)
+        # All keys cooling down, return first one (will error again but with proper handling)
         return self.keys[0] if self.keys else None
     
-    def mark_key_exhausted(self, key: str, error: str):
-        """Mark a key as exhausted and move to next one"""
-        if key in self.key_status:
-            self.key_status[key]["exhausted"] = True
-            self.key_status[key]["last_error"] = error
-            self.key_status[key]["exhausted_at"] = datetime.now().isoformat()
-            print(f"Marked API key as exhausted due to: {error}", flush=True)
+    def mark_key_exhausted(self, key: str, error: str, cooldown: Optional[float] = None):
+        """
+        Put a key on a cooldown; it re-enters rotation once the cooldown ends.
+        Without an explicit `cooldown` it is exponential in consecutive failures.
+        """
+        with self._lock:
+            if key not in self.key_status:
+                return
+            status = self.key_status[key]
+            if cooldown is None:
+                status["failures"] += 1
+                cooldown = min(KEY_COOLDOWN_MAX, KEY_COOLDOWN_BASE * (2 ** (status["failures"] - 1)))
+            status["exhausted"] = True
+            status["last_error"] = error
+            status["exhausted_at"] = datetime.now().isoformat()
+            status["cooldown_until"] = time.monotonic() + cooldown
+        logger.warning("API key cooling down for %.0fs after: %s", cooldown, error)
+        API_KEY_ROTATIONS.inc()
     
     def is_quota_error(self, error: str) -> bool:
         """Check if error is due to quota/rate limit"""
@@ -76,6 +211,20 @@ class APIKeyManager:
         ]
         return any(indicator in error_lower for indicator in quota_indicators)
     
+    def is_rate_limit_error(self, error: str) -> bool:
+        """A short-window (per-minute) 429, as opposed to a daily quota or an auth failure"""
+        error_lower = str(error).lower()
+        if any(marker in error_lower for marker in ("perday", "per day", "daily", "monthly")):
+            return False
+        return any(marker in error_lower for marker in ("429", "rate limit", "resource exhausted", "resource_exhausted"))
+
+    def retry_delay(self, error: str) -> float:
+        """Retry delay suggested by the provider's error, else KEY_RATE_LIMIT_PAUSE"""
+        match = _RETRY_DELAY_RE.search(str(error))
+        if match:
+            return min(KEY_COOLDOWN_MAX, float(match.group(1)))
+        return KEY_RATE_LIMIT_PAUSE
+
     def get_user_friendly_error(self, error: str) -> str:
         """Convert technical API error to user-friendly message"""
         error_str = str(error).lower()
@@ -93,21 +242,28 @@ class APIKeyManager:
     
     def get_status_report(self) -> dict:
         """Get a report of all API keys and their status"""
-        return {
-            "total_keys": len(self.keys),
-            "active_keys": sum(1 for k in self.key_status.values() if not k["exhausted"]),
-            "exhausted_keys": sum(1 for k in self.key_status.values() if k["exhausted"]),
-            "details": [
-                {
-                    "key": key[:20] + "..." if len(key) > 20 else key,  # Hide full key
-                    "exhausted": self.key_status[key]["exhausted"],
-                    "last_error": self.key_status[key]["last_error"],
-                    "exhausted_at": self.key_status[key]["exhausted_at"],
-                    "request_count": self.key_status[key]["request_count"]
-                }
-                for key in self.keys
-            ]
-        }
+        with self._lock:
+            now = time.monotonic()
+            available = {key: self._available(key, now) for key in self.keys}
+            return {
+                "strategy": KEY_STRATEGY,
+                "total_keys": len(self.keys),
+                "active_keys": sum(1 for ok in available.values() if ok),
+                "exhausted_keys": sum(1 for k in self.key_status.values() if k["exhausted"]),
+                "details": [
+                    {
+                        "key": key[:20] + "..." if len(key) > 20 else key,  # Hide full key
+                        "exhausted": self.key_status[key]["exhausted"],
+                        "available": available[key],
+                        "cooldown_seconds": max(0.0, self.key_status[key]["cooldown_until"] - now),
+                        "last_error": self.key_status[key]["last_error"],
+                        "exhausted_at": self.key_status[key]["exhausted_at"],
+                        "request_count": self.key_status[key]["request_count"],
+                        "in_flight": self.key_status[key]["in_flight"],
+                    }
+                    for key in self.keys
+                ]
+            }
 
 
 # Global instance
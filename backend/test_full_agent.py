@@ -2,13 +2,14 @@
 """
 Test the full agent graph with tool execution
 """
+import asyncio
 import os
 import sys
 sys.path.insert(0, os.path.dirname(__file__))
 
 from app.agent.graph import create_agent_graph
 from app.agent.tools import set_db_session
-from app.database import get_db
+from app.database import async_db
 from langchain_core.messages import HumanMessage
 
 print("=" * 80)
@@ -17,9 +18,7 @@ print("=" * 80)
 
 # Setup database
 try:
-    db_gen = get_db()
-    db = next(db_gen)
-    set_db_session(db)
+    set_db_session(async_db)
     print("[OK] Database connected")
 except Exception as e:
     print(f"[ERROR] Database error: {e}")
@@ -40,7 +39,7 @@ print("\nTest: 'Create a task to buy milk'")
 print("-" * 80)
 try:
     state = {"messages": [HumanMessage(content="Create a task to buy milk")]}
-    result = agent.invoke(state)
+    result = asyncio.run(agent.ainvoke(state))
     
     print(f"\nResult messages count: {len(result['messages'])}")
     for i, msg in enumerate(result['messages']):
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.agent import graph
+from app.routers.chat import _stream_agent_run
+
+
+class WordStreamModel(BaseChatModel):
+    """Replies "Hello there friend" one word at a time; like genai 0.0.x, only _astream streams"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "word-stream"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="Hello there friend"))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        for word in ("Hello", " there", " friend"):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word))
+            if run_manager:
+                await run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames: List[dict] = []
+
+    async def send_json(self, data):
+        self.frames.append(data)
+
+
+def test_model_tokens_are_forwarded_as_chunk_frames(monkeypatch):
+    monkeypatch.setattr(graph, "ChatGoogleGenerativeAI", lambda **kwargs: WordStreamModel())
+    agent = graph.create_agent_graph(api_key="test-key", tools=[])
+    websocket = FakeWebSocket()
+    state = {"messages": [HumanMessage(content="hi")], "summary": ""}
+
+    result = asyncio.run(_stream_agent_run(websocket, agent, state, {"configurable": {}}))
+
+    chunks = [f["message"] for f in websocket.frames if f["type"] == "chunk"]
+    assert chunks == ["Hello", " there", " friend"]
+    assert all(f["done"] is False for f in websocket.frames)
+    # The summed chunks land in the state as a plain message
+    reply = result["messages"][-1]
+    assert type(reply) is AIMessage and reply.content == "Hello there friend"
@@ -0,0 +1,16 @@
+import importlib
+
+import pytest
+
+
+@pytest.mark.parametrize("module", ["app.main", "app.agent.tools", "app.agent.graph", "app.routers.chat"])
+def test_module_imports(module):
+    # Tool schemas are built at import time; a model langchain can't describe fails here
+    importlib.import_module(module)
+
+
+def test_tool_schemas_are_declarable():
+    from app.agent.tools import get_all_tools
+
+    for tool in get_all_tools():
+        assert tool.args
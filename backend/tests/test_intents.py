@@ -0,0 +1,40 @@
+from app.agent.intents import match_intent
+
+
+def test_simple_commands_map_to_tools():
+    """High-confidence commands resolve to a direct tool call"""
+    assert match_intent("delete task 3").args == {"task_id": "3"}
+    assert match_intent("Please mark task #2 as done.").args == {"task_id": "2", "new_status": "done"}
+    assert match_intent("set task 4 to in progress").args == {"task_id": "4", "new_status": "in_progress"}
+    assert match_intent("make task 5 high priority").args == {"task_id": "5", "new_priority": "high"}
+    assert match_intent("show my tasks").tool == "list_tasks"
+    assert match_intent("list high priority tasks").args == {"priority": "high"}
+
+
+def test_ambiguous_messages_fall_through():
+    """Anything beyond the fixed grammar goes to the agent graph"""
+    assert match_intent("delete the task about groceries") is None
+    assert match_intent("mark task 2 done and create a task to call mom") is None
+    assert match_intent("show my tasks due tomorrow") is None
+    assert match_intent("") is None
+
+
+def test_listing_reply_is_readable_and_mentions_the_rest():
+    from app.agent.replies import render_task_listing
+    from app.agent.tools import TaskListing
+
+    listing = TaskListing([{"task_number": 1, "title": "Buy milk", "status": "todo", "priority": "high"}],
+                          total=3, overdue=1, offset=0)
+    reply = render_task_listing(listing, priority="high")
+    assert reply.startswith("Here are the first 1 of your 3 high priority tasks (1 overdue):")
+    assert "[Task 1] Buy milk | to do | high priority" in reply
+    assert "|title|" not in reply
+
+
+def test_saved_llm_calls_follow_the_terminal_tool_set():
+    from app.agent.graph import TERMINAL_TOOLS
+    from app.agent.intents import llm_calls_avoided
+
+    # Terminal tools would have cost the graph one call, others a second one to phrase the reply
+    assert llm_calls_avoided("list_tasks") == 2
+    assert llm_calls_avoided("delete_task") == (1 if "delete_task" in TERMINAL_TOOLS else 2)
@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+
+from app.agent.llm_limits import RateLimitExceeded, RequestCoalescer, TokenBucket
+
+
+def test_token_bucket_queues_then_rejects_past_deadline():
+    """Waiters get increasing waits in arrival order; one that can't fit before the deadline is rejected"""
+    bucket = TokenBucket(60)  # one token per second
+    deadline = time.monotonic() + 5
+    assert bucket.reserve(60, deadline) == 0.0
+    assert bucket.reserve(1, deadline) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1, deadline) == pytest.approx(2.0, abs=0.05)
+    with pytest.raises(RateLimitExceeded):
+        bucket.reserve(10, deadline)
+
+
+def test_coalescer_shares_one_call():
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "reply"
+
+    async def main():
+        return await asyncio.gather(*[coalescer.run("same", upstream) for _ in range(3)])
+
+    assert asyncio.run(main()) == ["reply"] * 3
+    assert len(calls) == 1
+    assert coalescer.stats()["coalesced"] == 2
+
+
+def test_cooling_down_keys_are_not_counted_as_candidates(monkeypatch):
+    from app.utils.api_key_manager import APIKeyManager
+
+    monkeypatch.setenv("GOOGLE_API_KEYS", "k1,k2,k3")
+    manager = APIKeyManager()
+    manager.mark_key_exhausted("k2", "quota exceeded", cooldown=60)
+    key = manager.acquire_key()
+    # With k2 cooling down, the second usable key is the last candidate and may queue
+    assert manager.available_count(exclude=[key]) == 1
+    assert manager.available_count(exclude=[key, manager.acquire_key(exclude=[key])]) == 0
+
+
+def test_coalesced_callers_get_their_own_message():
+    from langchain_core.messages import AIMessage
+
+    coalescer = RequestCoalescer()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        return AIMessage(content="reply", additional_kwargs={"function_call": {"name": "list_tasks"}})
+
+    async def main():
+        return await asyncio.gather(*[coalescer.run("same", upstream) for _ in range(3)])
+
+    leader, *followers = asyncio.run(main())
+    followers[0].additional_kwargs["function_call"]["name"] = "changed"
+    assert leader.additional_kwargs["function_call"]["name"] == "list_tasks"
+    assert followers[1].additional_kwargs["function_call"]["name"] == "list_tasks"
+    assert all(f.content == "reply" for f in followers)
@@ -0,0 +1,43 @@
+from app.agent.memory import ConversationMemory, SessionStore, estimate_tokens
+
+
+def test_history_replays_turns_in_order():
+    """Recent turns come back as alternating human / AI messages"""
+    memory = ConversationMemory(max_tokens=1000)
+    memory.add_turn("Add a task to buy milk", "Added 'buy milk' as Task 1.")
+    memory.add_turn("Mark it done", "Marked Task 1 as done.")
+
+    contents = [m.content for m in memory.messages()]
+    assert contents == ["Add a task to buy milk", "Added 'buy milk' as Task 1.", "Mark it done", "Marked Task 1 as done."]
+    assert memory.summary == ""
+
+
+def test_old_turns_are_summarized_within_budget():
+    """Turns beyond the token budget are folded into the rolling summary"""
+    memory = ConversationMemory(max_tokens=50)
+    for i in range(10):
+        memory.add_turn(f"Create task number {i} for the project review", f"Created Task {i}.")
+
+    recent_tokens = sum(estimate_tokens(u) + estimate_tokens(r) for u, r in memory.turns)
+    assert recent_tokens <= 50
+    assert memory.turns[-1][0] == "Create task number 9 for the project review"
+    assert "Create task number 0" in memory.summary
+
+
+def test_latest_turn_is_always_kept():
+    """A single oversized turn is kept verbatim rather than dropped"""
+    memory = ConversationMemory(max_tokens=5)
+    memory.add_turn("x" * 400, "y" * 400)
+    assert len(memory.turns) == 1
+
+
+def test_session_store_evicts_least_recently_used():
+    """The store never holds more than max_sessions sessions"""
+    store = SessionStore(max_sessions=2, max_tokens=100, idle_ttl=0)
+    first = store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert len(store) == 2
+    assert store.get("a") is first
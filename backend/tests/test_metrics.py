@@ -0,0 +1,34 @@
+from app.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Each bucket counts observations <= its bound; +Inf equals the total count"""
+    hist = Histogram("op_seconds", "Op latency", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        hist.observe(value, op="find")
+
+    lines = hist.render()
+    assert 'op_seconds_bucket{op="find",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{op="find",le="1.0"} 2' in lines
+    assert 'op_seconds_bucket{op="find",le="+Inf"} 3' in lines
+    assert 'op_seconds_count{op="find"} 3' in lines
+
+
+def test_counter_accumulates_per_label_set():
+    counter = Counter("tokens_total", "Tokens", ("kind",))
+    counter.inc(10, kind="input")
+    counter.inc(5, kind="input")
+    counter.inc(3, kind="output")
+    assert 'tokens_total{kind="input"} 15.0' in counter.render()
+    assert 'tokens_total{kind="output"} 3.0' in counter.render()
+
+
+def test_token_usage_reads_reported_counts_or_returns_none():
+    from langchain_core.messages import AIMessage
+    from app.metrics import token_usage
+
+    reported = AIMessage(content="hi", response_metadata={
+        "usage_metadata": {"prompt_token_count": 120, "candidates_token_count": 8}})
+    assert token_usage(reported) == {"input": 120, "output": 8}
+    # What the pinned langchain-google-genai returns: no usage at all
+    assert token_usage(AIMessage(content="hi", response_metadata={"finish_reason": "STOP"})) is None
@@ -0,0 +1,19 @@
+from app.agent.reply_cache import ReplyCache, is_read_only_query
+
+
+def test_read_only_queries_are_standalone_questions():
+    assert is_read_only_query("What's high priority?")
+    assert is_read_only_query("show my tasks")
+    assert not is_read_only_query("delete task 3")
+    assert not is_read_only_query("what about them?")
+
+
+def test_reply_cache_is_keyed_on_version_and_normalized_text():
+    cache = ReplyCache(max_entries=2, ttl=60)
+    cache.put("Show my  tasks?", 7, "Found 1 tasks")
+    assert cache.get("show my tasks", 7) == "Found 1 tasks"
+    assert cache.get("show my tasks", 8) is None
+
+    cache.put("a", 7, "A")
+    cache.put("b", 7, "B")
+    assert cache.get("show my tasks", 7) is None  # evicted as least recently used
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.search import TaskVectorIndex
+
+
+def test_vector_index_finds_typos_and_tracks_updates_and_deletes():
+    index = TaskVectorIndex(dim=256)
+    index.upsert([
+        {"_id": 1, "task_number": 1, "title": "Book dentist appointment"},
+        {"_id": 2, "task_number": 2, "title": "Buy groceries", "description": "milk and eggs"},
+        {"_id": 3, "task_number": 3, "title": "Call mom"},
+    ])
+    assert [d["_id"] for _, d in index.search("dentsit", 5)] == [1]
+    assert index.search("grocer", 1)[0][1]["_id"] == 2
+
+    index.upsert([{"_id": 1, "task_number": 1, "title": "Renew passport"}])
+    index.remove([2])
+    assert len(index) == 2
+    assert index.search("dentist", 5) == []
+    assert [d["_id"] for _, d in index.search("passport", 5)] == [1]
+    assert index.search("mom", 5)[0][1]["_id"] == 3
+
+
+def test_refresh_embeds_rows_off_the_event_loop():
+    import asyncio
+    import threading
+
+    class FakeRepository:
+        async def version(self):
+            return 1
+
+        def tombstone_horizon(self):
+            return None
+
+        async def find(self):
+            return [{"_id": 1, "task_number": 1, "title": "Book dentist appointment"}]
+
+    index = TaskVectorIndex(dim=64)
+    threads = []
+    embed_all = index.embed_all
+
+    def recording_embed_all(docs):
+        threads.append(threading.current_thread())
+        return embed_all(docs)
+
+    index.embed_all = recording_embed_all
+    asyncio.run(index.refresh(FakeRepository()))
+    assert threads and threads[0] is not threading.main_thread()
+    assert [d["_id"] for _, d in index.search("dentist", 5)] == [1]
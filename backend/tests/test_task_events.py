@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.task_events import TaskEventHub
+
+
+def test_subscribe_replays_backlog_after_resume_token():
+    async def main():
+        hub = TaskEventHub(db=None, mode="poll")
+        live, _ = hub.subscribe()
+        for n in (1, 2, 3):
+            hub.publish({"id": f"v{n}.1", "op": "update", "task_id": str(n), "doc": None})
+
+        _, replay = hub.subscribe("v1.1")
+        _, unknown = hub.subscribe("v0.9")
+        _, current = hub.subscribe("v3.1")
+        assert live.qsize() == 3
+        assert [e["id"] for e in replay] == ["v2.1", "v3.1"]
+        assert [e["op"] for e in unknown] == ["resync"]
+        assert current == []
+        hub._producer.cancel()
+
+    asyncio.run(main())
+
+
+def test_poll_publishes_only_rows_changed_since_the_last_poll(monkeypatch):
+    import app.task_events as task_events
+
+    now = datetime.utcnow()
+    state = {"version": 1, "changed": [], "deleted": [], "cutoffs": []}
+
+    class FakeRepository:
+        def __init__(self, db):
+            pass
+
+        async def version(self):
+            return state["version"]
+
+        def tombstone_horizon(self):
+            return now - timedelta(days=7)
+
+        async def changed_since(self, cutoff):
+            state["cutoffs"].append(cutoff)
+            return ([d for d in state["changed"] if d["updated_at"] > cutoff],
+                    [d for d in state["deleted"] if d["deleted_at"] > cutoff])
+
+    monkeypatch.setattr(task_events, "TaskRepository", FakeRepository)
+
+    async def main():
+        hub = TaskEventHub(db=None, mode="poll", poll_interval=0.01)
+        queue, _ = hub.subscribe()
+        await asyncio.sleep(0.03)
+        stamp = datetime.utcnow()
+        state["changed"] = [{"_id": 1, "created_at": stamp, "updated_at": stamp}]
+        state["version"] = 2
+        first = await asyncio.wait_for(queue.get(), 1)
+        # The next poll's overlap window returns task 1 again; only the delete is new
+        state["deleted"] = [{"_id": 2, "deleted_at": datetime.utcnow()}]
+        state["version"] = 3
+        second = await asyncio.wait_for(queue.get(), 1)
+        await asyncio.sleep(0.03)
+        hub.unsubscribe(queue)
+        return first, second, queue.qsize()
+
+    first, second, left = asyncio.run(main())
+    assert (first["op"], first["task_id"]) == ("insert", "1")
+    assert (second["op"], second["task_id"]) == ("delete", "2")
+    assert left == 0
+    # Seed read and first poll, then one read per version change, none while it stands still
+    assert len(state["cutoffs"]) == 4
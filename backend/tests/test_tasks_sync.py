@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta, timezone
+
+from app.routers.tasks import _etag, _etag_matches, _naive_utc
+
+
+def test_etag_depends_on_version_and_query():
+    etag = _etag(7, "limit=50")
+    assert etag.startswith('W/"tasks-7-')
+    assert _etag(8, "limit=50") != etag
+    assert _etag(7, "limit=10") != etag
+    assert _etag_matches(f'"other", {etag}', etag)
+    assert _etag_matches(etag[2:], etag)  # strong form of the same tag
+    assert not _etag_matches(None, etag)
+
+
+def test_since_is_compared_as_naive_utc():
+    aware = datetime(2026, 1, 1, 12, 0, tzinfo=timezone(timedelta(hours=2)))
+    assert _naive_utc(aware) == datetime(2026, 1, 1, 10, 0)
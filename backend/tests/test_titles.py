@@ -0,0 +1,18 @@
+from app.titles import normalize_title, pick_match, prefix_query, rank_titles
+
+
+def test_normalize_title_folds_case_accents_and_punctuation():
+    assert normalize_title("  Café   Meeting!! ") == "cafe meeting"
+    # Regex metacharacters are matched literally
+    assert prefix_query("report (.*)+")["title_norm"]["$regex"] == "^report"
+
+
+def test_pick_match_prefers_clear_winner_and_refuses_ties():
+    docs = [
+        {"task_number": 1, "title": "Buy milk"},
+        {"task_number": 2, "title": "Buy milk powder"},
+        {"task_number": 3, "title": "buy bread"},
+    ]
+    assert pick_match(rank_titles("buy milk", docs))["task_number"] == 1
+    assert pick_match(rank_titles("buy milk p", docs))["task_number"] == 2
+    assert pick_match(rank_titles("buy", docs)) is None
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from app.agent.tools import _render_table, _sort_spec, _table_columns
+
+
+def test_render_table_is_compact_and_stops_at_the_budget():
+    tasks = [{"task_number": i, "title": f"Task | {i}", "status": "todo", "due_date": datetime(2026, 1, i)}
+             for i in range(1, 21)]
+    table, shown = _render_table(tasks, ["title", "due"], budget=1000)
+    assert shown == 20
+    assert table.splitlines()[:2] == ["#|title|due", "1|Task / 1|2026-01-01"]
+
+    _, shown = _render_table(tasks, ["title", "due"], budget=30)
+    assert 1 <= shown < 20
+
+
+def test_sort_and_field_arguments_are_validated():
+    assert _sort_spec("-due_date")[0] == [("due_date", -1), ("task_number", -1)]
+    assert _sort_spec("priority")[0] is None
+    assert _table_columns(["Title", "due_date", "title"])[0] == ["title", "due"]
+    assert _table_columns(["colour"])[0] is None
@@ -1,9 +1,9 @@
 'use client';
 
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import ChatInterface from '@/components/ChatInterface';
 import TaskList from '@/components/TaskList';
-import { Task, getTasks, updateTask, deleteTask } from '@/lib/api';
+import { Task, TaskDelta, TaskStream, applyTaskDelta, getTasks, getTaskChanges, updateTask, deleteTask } from '@/lib/api';
 import { Moon, Sun, Menu } from 'lucide-react';
 import './App.css';
 
@@ -14,17 +14,67 @@ export default function Home() {
   const [loading, setLoading] = useState(true);
   const [showMobileTasks, setShowMobileTasks] = useState(false);
 
+  // True while the live task stream is connected
+  const liveRef = useRef(false);
+  // Deltas that arrive while a full fetch is in flight, applied on top of its result
+  const pendingDeltas = useRef<TaskDelta[] | null>(null);
+  // synced_at of the last full or delta fetch, for GET /api/tasks?since=
+  const syncedAtRef = useRef<string | null>(null);
+
   const fetchTasks = useCallback(async () => {
+    pendingDeltas.current = [];
     try {
       const data = await getTasks();
-      setTasks(data);
+      syncedAtRef.current = data.synced_at;
+      setTasks((pendingDeltas.current || []).reduce(applyTaskDelta, data.tasks));
     } catch (error) {
       console.error('Error fetching tasks:', error);
     } finally {
+      pendingDeltas.current = null;
       setLoading(false);
     }
   }, []);
 
+  // Pull only what changed since the last sync; falls back to a full fetch
+  const syncTasks = useCallback(async () => {
+    const since = syncedAtRef.current;
+    if (!since) return fetchTasks();
+    try {
+      const page = await getTaskChanges(since);
+      if (!page) return fetchTasks();
+      syncedAtRef.current = page.synced_at ?? since;
+      setTasks((prev) => {
+        const upserted = page.items.reduce(
+          (acc, task) => applyTaskDelta(acc, { op: 'update', id: String(task.id), task }),
+          prev
+        );
+        return (page.deleted || []).reduce((acc, id) => applyTaskDelta(acc, { op: 'delete', id }), upserted);
+      });
+    } catch (error) {
+      console.error('Error syncing tasks:', error);
+    }
+  }, [fetchTasks]);
+
+  // Chat replies only need a sync when the stream is down; otherwise its deltas keep the list current
+  const refreshTasks = useCallback(() => {
+    if (!liveRef.current) syncTasks();
+  }, [syncTasks]);
+
+  useEffect(() => {
+    const stream = new TaskStream(
+      (delta) => {
+        if (pendingDeltas.current) pendingDeltas.current.push(delta);
+        else setTasks((prev) => applyTaskDelta(prev, delta));
+      },
+      fetchTasks,
+      (live) => {
+        liveRef.current = live;
+      }
+    );
+    stream.connect();
+    return () => stream.disconnect();
+  }, [fetchTasks]);
+
   useEffect(() => {
     fetchTasks();
     
@@ -63,8 +113,8 @@ export default function Home() {
     try {
       // Use task_number if available, otherwise use task id
       const taskId = typeof id === 'number' ? id : id;
-      await updateTask(taskId, { status });
-      await fetchTasks();
+      const updated = await updateTask(taskId, { status });
+      setTasks((prev) => applyTaskDelta(prev, { op: 'update', id: String(updated.id), task: updated }));
     } catch (error) {
       console.error('Error updating task:', error);
     }
@@ -75,7 +125,7 @@ export default function Home() {
       // Use task_number if available, otherwise use task id
       const taskId = typeof id === 'number' ? id : id;
       await deleteTask(taskId);
-      await fetchTasks();
+      setTasks((prev) => prev.filter((t) => t.id !== taskId));
     } catch (error) {
       console.error('Error deleting task:', error);
     }
@@ -153,7 +203,7 @@ export default function Home() {
         {/* Chat Section (Left Panel) */}
         <div className="w-full md:w-1/2 border-r border-gray-300/50 dark:border-gray-700/50 flex flex-col shadow-2xl">
           <div className="flex-1 min-h-0">
-            <ChatInterface onTasksUpdated={fetchTasks} />
+            <ChatInterface onTasksUpdated={refreshTasks} />
           </div>
         </div>
 
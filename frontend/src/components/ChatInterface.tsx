@@ -2,7 +2,7 @@
 
 import { useState, useEffect, useRef } from 'react';
 import { Send, Bot, User, Loader2, Sparkles } from 'lucide-react';
-import { ChatWebSocket, createTask } from '@/lib/api';
+import { ChatWebSocket, createTask, getChatSessionId } from '@/lib/api';
 
 interface Message {
   id: string;
@@ -30,12 +30,14 @@ export default function ChatInterface({ onTasksUpdated }: ChatInterfaceProps) {
   const [input, setInput] = useState('');
   const [isConnected, setIsConnected] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
+  const [activeTool, setActiveTool] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const wsRef = useRef<ChatWebSocket | null>(null);
 
   useEffect(() => {
+    const sessionUrl = `${WS_URL}${WS_URL.includes('?') ? '&' : '?'}session_id=${encodeURIComponent(getChatSessionId())}`;
     const ws = new ChatWebSocket(
-      WS_URL,
+      sessionUrl,
       (payload) => {
 
         if (!payload) return;
@@ -60,25 +62,34 @@ export default function ChatInterface({ onTasksUpdated }: ChatInterfaceProps) {
             };
             return [...prev, newMsg];
           });
+        } else if (type === 'tool') {
+          // tool progress: show which tool is running next to the spinner
+          setActiveTool(payload.status === 'start' ? payload.name ?? null : null);
         } else if (type === 'agent' || type === 'done') {
-          // final agent message
-          setMessages((prev) => [
-            ...prev,
-            {
+          // final agent message: replaces the streamed draft, if any
+          setMessages((prev) => {
+            const last = prev[prev.length - 1];
+            const finalMsg = {
               id: Date.now().toString(),
               text,
-              sender: 'agent',
+              sender: 'agent' as const,
               timestamp: new Date(),
-            },
-          ]);
+            };
+            if (last && last.sender === 'agent' && last.id.startsWith('agent-stream-')) {
+              return [...prev.slice(0, -1), finalMsg];
+            }
+            return [...prev, finalMsg];
+          });
           // Only set loading to false if message is marked as done or final
           if (isDone) {
             setIsLoading(false);
+            setActiveTool(null);
             onTasksUpdated();
           }
         } else if (type === 'error') {
+          setActiveTool(null);
           setMessages((prev) => [
-            ...prev,
+            ...prev.filter((m) => !m.id.startsWith('agent-stream-')),
             {
               id: Date.now().toString(),
               text: text || "An error occurred. Please try again.",
@@ -304,7 +315,12 @@ export default function ChatInterface({ onTasksUpdated }: ChatInterfaceProps) {
               <Bot size={22} className="text-gray-700 dark:text-gray-300" />
             </div>
             <div className="bg-white/90 dark:bg-gray-800/90 rounded-3xl px-6 py-4 shadow-2xl border-2 border-gray-200/50 dark:border-gray-600/50 backdrop-blur-xl">
-              <Loader2 size={24} className="animate-spin text-blue-600" />
+              <div className="flex items-center gap-3">
+                <Loader2 size={24} className="animate-spin text-blue-600" />
+                {activeTool && (
+                  <span className="text-sm text-gray-500 dark:text-gray-400">Running {activeTool}…</span>
+                )}
+              </div>
             </div>
           </div>
         )}
@@ -12,16 +12,67 @@ export interface Task {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
-export async function getTasks(): Promise<Task[]> {
-  console.log("15 inside get tasks");
-  
-  const response = await fetch(`${API_URL}/api/tasks`);
-  console.log("18 response:", response);
-  
+export interface TaskPage {
+  items: Task[];
+  next_cursor: string | null;
+  version?: number;
+  // Pass back as `since` to fetch only later changes
+  synced_at?: string;
+  // Delta responses only: ids of deleted tasks
+  deleted?: string[] | null;
+}
+
+export interface TaskQuery {
+  limit?: number;
+  after?: string | null;
+  status?: Task['status'];
+  priority?: Task['priority'];
+  due_after?: string;
+  due_before?: string;
+  fields?: (keyof Task)[];
+}
+
+export async function getTaskPage(query: TaskQuery = {}): Promise<TaskPage> {
+  const params = new URLSearchParams();
+  Object.entries(query).forEach(([key, value]) => {
+    if (value === undefined || value === null) return;
+    params.set(key, Array.isArray(value) ? value.join(',') : String(value));
+  });
+  const qs = params.toString();
+  const response = await fetch(`${API_URL}/api/tasks/${qs ? `?${qs}` : ''}`);
   if (!response.ok) throw new Error('Failed to fetch tasks');
   return response.json();
 }
 
+export interface TaskSnapshot {
+  tasks: Task[];
+  synced_at: string | null;
+}
+
+export async function getTasks(): Promise<TaskSnapshot> {
+  // Walk the cursor pages so the dashboard still shows every task
+  const tasks: Task[] = [];
+  let after: string | null = null;
+  let syncedAt: string | null = null;
+  do {
+    const page: TaskPage = await getTaskPage({ limit: 200, after });
+    tasks.push(...page.items);
+    // The first page's timestamp is the safe point to sync from
+    syncedAt = syncedAt ?? page.synced_at ?? null;
+    after = page.next_cursor;
+  } while (after);
+  return { tasks, synced_at: syncedAt };
+}
+
+// Tasks changed and deleted since an earlier synced_at. Returns null when the
+// server no longer has the delete history that far back (reload everything).
+export async function getTaskChanges(since: string): Promise<TaskPage | null> {
+  const response = await fetch(`${API_URL}/api/tasks/?since=${encodeURIComponent(since)}`);
+  if (response.status === 410) return null;
+  if (!response.ok) throw new Error('Failed to fetch task changes');
+  return response.json();
+}
+
 export async function updateTask(id: number | string, data: Partial<Task>): Promise<Task> {
   const response = await fetch(`${API_URL}/api/tasks/${id}`, {
     method: 'PATCH',
@@ -70,13 +121,107 @@ export async function createTask(data: TaskCreate): Promise<Task> {
   return response.json();
 }
 
+// Change pushed by GET /api/tasks/stream
+export interface TaskDelta {
+  op: 'insert' | 'update' | 'delete';
+  id: string;
+  task?: Task;
+}
+
+// Apply a delta to a task list kept in task_number order. Idempotent, so a
+// delta that is already reflected in the list is harmless.
+export function applyTaskDelta(tasks: Task[], delta: TaskDelta): Task[] {
+  const rest = tasks.filter((t) => String(t.id) !== delta.id);
+  if (delta.op === 'delete' || !delta.task) return rest;
+  const task = delta.task;
+  const index = tasks.findIndex((t) => String(t.id) === delta.id);
+  if (index !== -1) {
+    const next = [...tasks];
+    next[index] = task;
+    return next;
+  }
+  const position = rest.findIndex((t) => (t.task_number ?? 0) > (task.task_number ?? 0));
+  return position === -1 ? [...rest, task] : [...rest.slice(0, position), task, ...rest.slice(position)];
+}
+
+// Server-sent task deltas. EventSource reconnects by itself and sends the
+// last event id, so the server replays what was missed; when it can't, it
+// sends "resync" and the list should be refetched.
+export class TaskStream {
+  private source: EventSource | null = null;
+  private connectedOnce = false;
+
+  constructor(
+    private onDelta: (delta: TaskDelta) => void,
+    private onResync: () => void,
+    private onStatus?: (live: boolean) => void
+  ) {}
+
+  connect() {
+    this.source = new EventSource(`${API_URL}/api/tasks/stream`);
+
+    this.source.addEventListener('ready', (event) => {
+      const { resumed } = JSON.parse((event as MessageEvent).data);
+      // The page loads the list itself on mount; later fresh connections may have missed changes
+      if (this.connectedOnce && !resumed) this.onResync();
+      this.connectedOnce = true;
+      if (this.onStatus) this.onStatus(true);
+    });
+
+    this.source.addEventListener('task', (event) => {
+      try {
+        this.onDelta(JSON.parse((event as MessageEvent).data));
+      } catch (err) {
+        console.error('Failed to parse task event:', err);
+      }
+    });
+
+    this.source.addEventListener('resync', () => this.onResync());
+
+    this.source.onerror = () => {
+      if (this.onStatus) this.onStatus(false);
+    };
+  }
+
+  disconnect() {
+    if (this.source) {
+      this.source.close();
+      this.source = null;
+    }
+  }
+}
+
+// Stable id for this browser tab so the backend keeps conversation memory across reconnects
+export function getChatSessionId(): string {
+  const key = 'chatSessionId';
+  let id = sessionStorage.getItem(key);
+  if (!id) {
+    id = typeof crypto !== 'undefined' && 'randomUUID' in crypto
+      ? crypto.randomUUID()
+      : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem(key, id);
+  }
+  return id;
+}
+
+// Frames sent by /api/chat/ws. Partial frames ("chunk" tokens and "tool"
+// progress) carry done: false; the final "agent" or "error" frame carries done: true.
+export interface ChatFrame {
+  type?: 'chunk' | 'tool' | 'agent' | 'error' | 'done';
+  message?: string;
+  done?: boolean;
+  name?: string;
+  status?: 'start' | 'end';
+  error_type?: string;
+}
+
 export class ChatWebSocket {
   private ws: WebSocket | null = null;
   private reconnectTimeout: NodeJS.Timeout | null = null;
 
   constructor(
     private url: string,
-    private onMessage: (payload: any) => void,
+    private onMessage: (payload: ChatFrame) => void,
     private onOpen?: () => void,
     private onClose?: () => void
   ) {}
@@ -98,8 +243,8 @@ export class ChatWebSocket {
 
     this.ws.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data);
-        console.log('WebSocket received:', data);
+        const data: ChatFrame = JSON.parse(event.data);
+        if (data.done !== false) console.log('WebSocket received:', data);
         this.onMessage(data);
       } catch (err) {
         console.error('Failed to parse WebSocket message:', err, 'raw:', event.data);